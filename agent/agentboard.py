@@ -1,48 +1,131 @@
-from referee.game import Action, SpawnAction, SpreadAction, HexPos, HexDir, PlayerColor
+from referee.game import HexPos, PlayerColor
+
+from .tables import CELLS, CELL_INDEX, SPREAD_TARGETS, ZOBRIST_KEYS, ROW_DISTANCES, R_Q_DISTANCES, DISTANCES, \
+    ADJACENT, ADJACENT_CELLS, NEIGHBOURS, CELLS_BY_DISTANCE
+from .groups import GroupMap
+from .threats import ThreatMap
+from .moves import FIRST_SPREAD, NUM_DIRECTIONS, MOVE_CELL, MOVE_DIR, MOVE_ACTIONS, spread_move, encode_action
 
 class BoardState:
     # a list of all coordinates on the hex board (with a range and domain of 0 to 7)
     grid_coords = [(r, q) for r in range(0, 7) for q in range(0, 7)]
 
 
-    def __init__(self, board: dict, history: list, depth, agentColor: PlayerColor):
-        '''board is a dictionary of (r, q) coordinates and (p, k) cell states'''
+    def __init__(self, board: dict, history: list, depth, agentColor: PlayerColor, debug=False):
+        '''board is a dictionary of (r, q) coordinates and (p, k) cell states.
+        In debug mode, the incrementally maintained counters are checked against a full rescan after every move'''
+        self.debug = debug
         self.board = board
         self.history = history
         self.depth = depth
         self.agentColor = agentColor
-        # The set of visited states is only stored in the root node. Note that 'visited' states means a node that has had its children generated
+        # The hashes of the positions reached by moves played through update_boardstate, ie. the actual game so far
         self.visited_states = set()
+        # One entry per move applied with make_move, holding the previous state of every cell the move touched
+        self.undo_stack = []
+
+    @property
+    def board(self):
+        '''The dictionary of (r, q) coordinates and (p, k) cell states'''
+        return self._board
+
+    @board.setter
+    def board(self, board: dict):
+        '''Replace the whole board, recounting the power and tile counters and the hash from scratch'''
+        self._board = board
+        (self._power, self._tiles) = self.count_board(board)
+        self.hash = self.hash_board(board)
+        self._threats = None
+        self._groups = None
+
+    @property
+    def threats(self):
+        '''The ThreatMap of the present board. It is built on first use, and then kept up to date as moves are made'''
+        if self._threats is None:
+            self._threats = ThreatMap.from_board(self._board)
+        return self._threats
+
+    @property
+    def groups(self):
+        '''The GroupMap of the present board. Like the threat map, it is built on first use and then kept up to date'''
+        if self._groups is None:
+            self._groups = GroupMap.from_board(self._board)
+        return self._groups
+
+    @staticmethod
+    def count_board(board: dict):
+        '''Scan a board, returning the [red, blue] power and the [red, blue] tile counts'''
+        power = [0, 0]
+        tiles = [0, 0]
+        for (player, k) in board.values():
+            power[player.value] += k
+            tiles[player.value] += 1
+        return power, tiles
+
+    @staticmethod
+    def hash_board(board: dict):
+        '''Compute the 64-bit Zobrist hash of a board from scratch'''
+        hash = 0
+        for ((r, q), (player, k)) in board.items():
+            hash ^= ZOBRIST_KEYS[CELL_INDEX[(r, q)]][player.value][k]
+        return hash
+
+    def verify_counters(self):
+        '''Check the incrementally maintained counters, hash, threat map and group map against a full rescan of the
+        board'''
+        (power, tiles) = self.count_board(self._board)
+        assert self._power == power, f"power counters {self._power} do not match board {power}"
+        assert self._tiles == tiles, f"tile counters {self._tiles} do not match board {tiles}"
+        assert self.hash == self.hash_board(self._board), "hash does not match board"
+        if self._threats is not None:
+            assert self._threats == ThreatMap.from_board(self._board), "threat map does not match board"
+        if self._groups is not None:
+            assert self._groups == GroupMap.from_board(self._board), "group map does not match board"
 
     def copy(self):
         '''Return a copy of the current board state'''
-        return BoardState(self.board.copy(), self.history.copy(), self.depth, self.agentColor)
+        return BoardState(self.board.copy(), self.history.copy(), self.depth, self.agentColor, self.debug)
+
+    def get_color_power(self, color: PlayerColor):
+        '''Get the combined power of all tiles of the given colour on the present board'''
+        return self._power[color.value]
+
+    def get_tile_count(self, color: PlayerColor):
+        '''Get the number of tiles of the given colour on the present board'''
+        return self._tiles[color.value]
 
     def get_spreadmoves(self, myColor: PlayerColor):
         '''Return a list of all possible spreadmoves from the current board state'''
-        spreadmoves = []
-        for ((x, y), (player, k)) in self.board.items():
-            if (player == myColor):
-                spreadmoves += self.generate_spreadmoves(x, y)
-        return spreadmoves
+        return [MOVE_ACTIONS[move] for move in self.get_encoded_spreadmoves(myColor)]
     
     def get_spawnmoves(self):
         '''Return a list of all possible spawnmoves from the current board state'''
-        spawnmoves = []
-        for coord in self.grid_coords:
-            if coord not in self.board:
-                spawnmoves.append(SpawnAction(HexPos(coord[0], coord[1])))
-        return spawnmoves
+        return [MOVE_ACTIONS[move] for move in self.get_encoded_spawnmoves()]
+
+    def get_encoded_spreadmoves(self, myColor: PlayerColor):
+        '''Return a list of all possible spreadmoves from the current board state, as encoded moves (see moves.py).
+        Tiles are visited in grid order rather than dict order, as make_move/unmake_move reorders the board dict'''
+        spreadmoves = []
+        board = self._board
+        for (i, coord) in enumerate(self.grid_coords):
+            tile = board.get(coord)
+            if tile is not None and tile[0] == myColor:
+                first = spread_move(i, 0)
+                spreadmoves += range(first, first + NUM_DIRECTIONS)
+        return spreadmoves
+
+    def get_encoded_spawnmoves(self):
+        '''Return a list of all possible spawnmoves from the current board state, as encoded moves (see moves.py)'''
+        board = self._board
+        return [i for (i, coord) in enumerate(self.grid_coords) if coord not in board]
 
     def generate_spreadmoves(self, x, y):
         """
         Returns a list of all possible moves for a given tile, ie. is of form [(r,q,dr,dq)].
         Basically just generates 6 moves for each hexagonal direction
         """
-        moves = []
-        for dir in HexDir:
-            moves.append(SpreadAction(HexPos(x, y), dir))
-        return moves
+        first = spread_move(CELL_INDEX[(x, y)], 0)
+        return MOVE_ACTIONS[first:first + NUM_DIRECTIONS]
 
     def update_history(self, move):
         '''Update the history of the board state with the given move'''
@@ -57,8 +140,10 @@ class BoardState:
             return False
         return True
     
-    def get_total_power(self, board: dict):
-        '''Get the total power of all tiles on the board'''
+    def get_total_power(self, board: dict = None):
+        '''Get the total power of all tiles on the board. This is a counter read for the present board'''
+        if board is None or board is self._board:
+            return self._power[0] + self._power[1]
         total_power = 0
         for ((r, q), (player, k)) in board.items():
             total_power += k
@@ -74,266 +159,255 @@ class BoardState:
 
         return self.get_my_power(board) - self.get_opp_power(self.agentColor, board)
     
+    def move_delta(self, move, playerColour):
+        '''
+        Work out the effect of a move (an encoded move) by the given colour without playing it, from the source stack
+        and the cells it spreads onto. Returns (the change in the mover's power, the change in the opponent's power,
+        whether the opponent has no power left afterwards).
+        '''
+        # The opponent's counter is indexed directly, as PlayerColor.opponent is slow next to the rest of this
+        opp_power = self._power[1 - playerColour.value]
+        if move < FIRST_SPREAD:
+            return (1, 0, opp_power == 0)
+
+        board = self._board
+        cell = MOVE_CELL[move]
+        power = board[CELLS[cell]][1]
+        # The source stack is lifted off, and each target it lands on gains a power and changes to the mover's colour
+        mine = -power
+        theirs = 0
+        for target in SPREAD_TARGETS[cell][MOVE_DIR[move]][power - 1]:
+            existing = board.get(target)
+            if existing is None:
+                mine += 1
+                continue
+            k = existing[1]
+            if existing[0] != playerColour:
+                theirs -= k
+            else:
+                mine -= k
+            # if the tile is at max power, it will be emptied, ie. removed from the board
+            if k < 6:
+                mine += k + 1
+        return (mine, theirs, opp_power + theirs == 0)
+
     def calculate_move_impact(self, move, playerColour):
-        '''Calculate the net gain/loss of a given move'''
-        return self.get_board_net_score(self.get_new_boardstate(move, playerColour)) - self.get_board_net_score(self.board)
+        '''Calculate the net gain/loss of a given move (a referee Action or an encoded move), for the board's agent'''
+        if type(move) is not int:
+            move = encode_action(move)
+        (mine, theirs, _) = self.move_delta(move, playerColour)
+        return mine - theirs if playerColour == self.agentColor else theirs - mine
     
     def calculate_move_opp_impact(self, move, myColour):
-        '''Calculate the net gain/loss opponent power of a given move'''
-        return self.get_opp_power(myColour, self.get_new_boardstate(move, myColour)) - self.get_opp_power(myColour, self.board)
+        '''Calculate the net gain/loss opponent power of a given move (a referee Action or an encoded move)'''
+        if type(move) is not int:
+            move = encode_action(move)
+        return self.move_delta(move, myColour)[1]
     
-    def check_if_win(self, myColor, board):
+    def check_if_win(self, myColor, board=None):
         '''Check if the given board is a winning board'''
         if self.get_opp_power(myColor, board) == 0:
             return True
         return False
 
+    def check_if_move_wins(self, move, myColor):
+        '''Check if a move (an encoded move) leaves the opponent with no power, without playing it'''
+        return self.move_delta(move, myColor)[2]
+
     def update_boardstate(self, move, playerColour):
         """
-        Given a move, update the boardState with the move, using get_new_boardstate
+        Given a move, update the boardState with the move, using make_move
         """
-        self.board = self.get_new_boardstate(move, playerColour)
+        self.make_move(move, playerColour)
+        self.visited_states.add(self.hash)
+
+    def make_move(self, move, playerColour):
+        '''Apply a move (either a referee Action or an encoded move) to the board in place. Only the previous state of
+        the touched cells is recorded, so the move can be reverted with unmake_move without copying the board'''
+        if type(move) is not int:
+            move = encode_action(move)
+        board = self._board
+        set_cell = self._set_cell
+        cell = MOVE_CELL[move]
+        key = CELLS[cell]
+
+        if move < FIRST_SPREAD:
+            changes = [(key, board.get(key))]
+            set_cell(key, (playerColour, 1))
+
+        else:
+            source = board[key]
+            changes = [(key, source)]
+            set_cell(key, None)
+
+            for target in SPREAD_TARGETS[cell][MOVE_DIR[move]][source[1] - 1]:
+                existing = board.get(target)
+                changes.append((target, existing))
+                if existing is None:
+                    set_cell(target, (playerColour, 1))
+                elif existing[1] < 6:
+                    set_cell(target, (playerColour, existing[1] + 1))
+                else:
+                    # if the tile is at max power, it will be emptied, ie. removed from the board
+                    set_cell(target, None)
+
+        self.undo_stack.append(changes)
         self.depth += 1
         self.update_history(move)
+        if self.debug:
+            self.verify_counters()
+
+    def unmake_move(self):
+        '''Revert the last move applied with make_move. Throws an IndexError if there are no moves to undo'''
+        if len(self.undo_stack) == 0:
+            raise IndexError("No moves to undo.")
+
+        for (key, prev) in reversed(self.undo_stack.pop()):
+            self._set_cell(key, prev)
+        self.depth -= 1
+        self.history.pop()
+        if self.debug:
+            self.verify_counters()
+
+    def _set_cell(self, key, tile):
+        '''Set a cell to the given (p, k) state (or None to empty it), keeping the counters, hash, threat map and group
+        map up to date'''
+        board = self._board
+        cell = CELL_INDEX[key]
+        keys = ZOBRIST_KEYS[cell]
+        prev = board.get(key)
+        if self._threats is not None:
+            self._threats.update(cell, prev, tile)
+        if self._groups is not None:
+            self._groups.update(cell, prev, tile)
+        if prev is not None:
+            self._power[prev[0].value] -= prev[1]
+            self._tiles[prev[0].value] -= 1
+            self.hash ^= keys[prev[0].value][prev[1]]
+        if tile is None:
+            if prev is not None:
+                del board[key]
+        else:
+            board[key] = tile
+            self._power[tile[0].value] += tile[1]
+            self._tiles[tile[0].value] += 1
+            self.hash ^= keys[tile[0].value][tile[1]]
 
-    
     def get_new_boardstate(self, move, playerColour):
-        '''Get the new board state after a given move'''
-        match move:
-            case SpawnAction(cell):
-                new_board = self.board.copy()
-                new_board[(cell.r, cell.q)] = (playerColour, 1)
-                return new_board
-            
-            case SpreadAction(cell, direction):
-                cell_power_count = 1
-                new_board = self.board.copy()
-                new_board.pop((cell.r, cell.q))
-
-                # spread in the direction of the move
-                match direction:
-                    case HexDir.DownRight:
-                        while cell_power_count <= self.board[(cell.r, cell.q)][1]:
-                            # place a new tile in the down right direction
-                            x, y = (cell.r, cell.q + cell_power_count)
-                            x, y = self.wraparound_if_necessary(x, y)
-
-                            if (x, y) in new_board:
-                                existing_power = new_board[(x, y)][1]
-                            else:
-                                existing_power = 0
-
-                            if (existing_power < 6):
-                                new_board[(x, y)] = (playerColour, existing_power + 1)
-
-                            else:
-                                # if the tile is at max power, it will be emptied, ie. removed from the board
-                                new_board.pop((x, y))
-
-                            cell_power_count += 1
-                        return new_board
-                        
-                    case HexDir.Down:
-                        while cell_power_count <= self.board[(cell.r, cell.q)][1]:
-                            # place a new tile in the down direction
-                            x, y = (cell.r - cell_power_count, cell.q + cell_power_count)
-                            x, y = self.wraparound_if_necessary(x, y)
-
-                            if (x, y) in new_board:
-                                existing_power = new_board[(x, y)][1]
-                            else:
-                                existing_power = 0
-
-                            if (existing_power < 6):
-                                new_board[(x, y)] = (playerColour, existing_power + 1)
-
-                            else:
-                                # if the tile is at max power, it will be emptied, ie. removed from the board
-                                new_board.pop((x, y))
-
-                            cell_power_count += 1
-                        return new_board
-                        
-                    case HexDir.DownLeft:
-                        while cell_power_count <= self.board[(cell.r, cell.q)][1]:
-                            # place a new tile in the down left direction
-                            x, y = (cell.r - cell_power_count, cell.q)
-                            x, y = self.wraparound_if_necessary(x, y)
-                            
-                            if (x, y) in new_board:
-                                existing_power = new_board[(x, y)][1]
-                            else:
-                                existing_power = 0
-
-                            if (existing_power < 6):
-                                new_board[(x, y)] = (playerColour, existing_power + 1)
-
-                            else:
-                                # if the tile is at max power, it will be emptied, ie. removed from the board
-                                new_board.pop((x, y))
-
-                            cell_power_count += 1
-                        return new_board
-                        
-                    case HexDir.UpLeft:
-                        while cell_power_count <= self.board[(cell.r, cell.q)][1]:
-                            # place a new tile in the up left direction
-                            x, y = (cell.r, cell.q - cell_power_count)
-                            x, y = self.wraparound_if_necessary(x, y)
-
-                            if (x, y) in new_board:
-                                existing_power = new_board[(x, y)][1]
-                            else:
-                                existing_power = 0
-
-
-                            if (existing_power < 6):
-                                new_board[(x, y)] = (playerColour, existing_power + 1)
-                            else:
-                                # if the tile is at max power, it will be emptied, ie. removed from the board
-                                new_board.pop((x, y))
-
-                            cell_power_count += 1
-                        return new_board
-                        
-                    case HexDir.Up:
-                        while cell_power_count <= self.board[(cell.r, cell.q)][1]:
-                            # place a new tile in the up direction
-                            x, y = (cell.r + cell_power_count, cell.q - cell_power_count)
-                            x, y = self.wraparound_if_necessary(x, y)
-                            
-                            if (x, y) in new_board:
-                                existing_power = new_board[(x, y)][1]
-                            else:
-                                existing_power = 0
-
-                            if (existing_power < 6):
-                                new_board[(x, y)] = (playerColour, existing_power + 1)
-
-                            else:
-                                # if the tile is at max power, it will be emptied, ie. removed from the board
-                                new_board.pop((x, y))
-
-                            cell_power_count += 1
-                        return new_board
-                        
-                    case HexDir.UpRight:
-                        while cell_power_count <= self.board[(cell.r, cell.q)][1]:
-                            # place a new tile in the up right direction
-                            x, y = (cell.r + cell_power_count, cell.q)
-                            x, y = self.wraparound_if_necessary(x, y)
-                            
-                            if (x, y) in new_board:
-                                existing_power = new_board[(x, y)][1]
-                            else:
-                                existing_power = 0
-
-                            if (existing_power < 6):
-                                new_board[(x, y)] = (playerColour, existing_power + 1)
-                            
-                            else:
-                                # if the tile is at max power, it will be emptied, ie. removed from the board
-                                new_board.pop((x, y))
-
-                            cell_power_count += 1
-                        return new_board
-                        
+        '''Get the new board state after a given move (either a referee Action or an encoded move)'''
+        if type(move) is not int:
+            move = encode_action(move)
+        new_board = self.board.copy()
+        cell = MOVE_CELL[move]
+
+        if move < FIRST_SPREAD:
+            new_board[CELLS[cell]] = (playerColour, 1)
+            return new_board
+
+        (_, power) = new_board.pop(CELLS[cell])
+
+        # spread in the direction of the move, using the precomputed cells that a spread of this power lands on
+        for target in SPREAD_TARGETS[cell][MOVE_DIR[move]][power - 1]:
+            existing = new_board.get(target)
+            if existing is None:
+                new_board[target] = (playerColour, 1)
+            elif existing[1] < 6:
+                new_board[target] = (playerColour, existing[1] + 1)
+            else:
+                # if the tile is at max power, it will be emptied, ie. removed from the board
+                del new_board[target]
+        return new_board
 
     def simple_heuristic(self):
         '''simple heuristic 1. Counts how many blue tiles are on the board'''
-        blue_power = 2 * len(self.get_blue_tiles())
+        blue_power = 2 * self.get_tile_count(PlayerColor.BLUE)
         return blue_power
     
     def simple_heuristic_2(self):
         '''simple heuristic 2. This takes into account the linear groupings of blue tiles. E.g. if there are adjacent blue tiles in a row
             or column, it will be more likely that they will be taken in the same spread action
             This heuristic totals the blue tiles, and subtracts the number of blue tiles that are in a linear grouping'''
-        blue_power = len(self.get_blue_tiles())
-        blue_power -= self.get_linear_blue_groupings()
+        blue_power = self.get_tile_count(PlayerColor.BLUE)
+        blue_power -= self.groups.grouped_stacks(PlayerColor.BLUE)
         return blue_power
     
     def simple_heuristic_3(self):
         '''simple heuristic 3. This finds the distance between the closest red and blue tiles'''
         running_total = 0
-        if (len(self.get_blue_tiles()) == 0):
+        if (self.get_tile_count(PlayerColor.BLUE) == 0):
             return 0
         
-        # this is a list of all used red tiles in computing closest red tile to each blue tile.
+        # this is the set of all used red tiles in computing closest red tile to each blue tile.
         # this is kept unique to ensure the heuristic is more accurate
-        used_red_tiles = []
+        used_red_tiles = set()
         for blue_tile in self.get_blue_tiles():
             running_total += self.get_distance_to_closest_red_tile(blue_tile, used_red_tiles)
         return running_total
 
     def get_linear_blue_groupings(self):
         '''Function which counts how many blue tiles are in a linear grouping. E.g. if there are adjacent blue tiles in a row
-            Used in heuristic 2'''
-        linear_groupings = set()
-        tiles = {"r": [], "b": []}
-
-        # Build a split dictionary of all red and blue tiles
-        for ((r, q), (player, k)) in self.board.items():
-            tiles[player].append((r, q))
-
-        # Check if each blue tile is adjacent to any other blue tile
-        for (r1, q1) in tiles["b"]:
-            for (r2, q2) in tiles["b"]:
-                if self.tiles_are_adjacent(r1, q1, r2, q2):
-                    linear_groupings.add((r1, q1))
-                    linear_groupings.add((r2, q2))
-        return len(linear_groupings)
+            Each blue tile only checks its (precomputed) neighbours, so this is linear in the number of tiles.
+            Heuristic 2 reads the same count from the board's GroupMap, which keeps it up to date as moves are made'''
+        board = self.board
+        linear_groupings = 0
+        for ((r, q), (player, k)) in board.items():
+            if player != PlayerColor.BLUE:
+                continue
+            for neighbour in NEIGHBOURS[r * 7 + q]:
+                tile = board.get(neighbour)
+                if tile is not None and tile[0] == PlayerColor.BLUE:
+                    linear_groupings += 1
+                    break
+        return linear_groupings
     
     def get_distance_to_closest_red_tile(self, blue_tile, used_red_tiles):
-        '''Function which returns the distance to the closest red tile for a given blue tile
+        '''Function which returns the distance to the closest red tile (that isn't already used) for a given blue tile, and marks it as used.
+        Cells are checked in order of their (precomputed) distance from the blue tile, so the first unused red tile found is the closest.
         Used in heuristic 3'''
-        min_dist = 7
-        for (r, q), (player, k) in self.get_red_tiles():
-            dr, dq = self.get_r_q_distances_between_two_tiles(blue_tile[0][0], blue_tile[0][1], r, q)
-            if dr + dq < min_dist and (r, q) not in used_red_tiles:
-                min_dist = dr + dq
-                used_red_tiles.append((r, q))
-        return min_dist
+        board = self.board
+        origin = CELL_INDEX[blue_tile[0]]
+        for i in CELLS_BY_DISTANCE[origin]:
+            tile = board.get(CELLS[i])
+            if tile is not None and tile[0] == PlayerColor.RED and CELLS[i] not in used_red_tiles:
+                used_red_tiles.add(CELLS[i])
+                return DISTANCES[origin][i]
+        return 7
     
     def get_r_q_distances_between_two_tiles(self, r1, q1, r2, q2):
         '''Get the (r, q) distances between two tiles on the board, accounting for wrapping around the edges'''
-        dr = abs(r1 - r2)
-        dq = abs(q1 - q2)
-        if dr > 3:
-            dr = 7 - dr
-        if dq > 3:
-            dq = 7 - dq
-        return dr, dq
+        return R_Q_DISTANCES[r1 * 7 + q1][r2 * 7 + q2]
 
     def distance_between_closest_two_tiles(self):
-        '''Get the minimum distance between any two red and blue tiles on the board'''
-        min_dist_r = 7
-        min_dist_q = 7
-        tiles = {"r": [], "b": []}
+        '''Get the minimum distance between any two red and blue tiles on the board.
+        The minimum dr only depends on which rows hold red and blue tiles (and similarly for dq), so only rows and columns are compared'''
+        rows = {PlayerColor.RED: set(), PlayerColor.BLUE: set()}
+        cols = {PlayerColor.RED: set(), PlayerColor.BLUE: set()}
         for ((r, q), (player, k)) in self.board.items():
-            tiles[player].append((r, q))
-        for (r1, q1) in tiles["r"]:
-            for (r2, q2) in tiles["b"]:
-                dr, dq = self.get_r_q_distances_between_two_tiles(r1, q1, r2, q2)
-                if dr < min_dist_r:
-                    min_dist_r = dr
-                if dq < min_dist_q:
-                    min_dist_q = dq
+            rows[player].add(r)
+            cols[player].add(q)
+
+        min_dist_r = min((ROW_DISTANCES[r1][r2] for r1 in rows[PlayerColor.RED] for r2 in rows[PlayerColor.BLUE]), default=7)
+        min_dist_q = min((ROW_DISTANCES[q1][q2] for q1 in cols[PlayerColor.RED] for q2 in cols[PlayerColor.BLUE]), default=7)
 
         # Return the square root of the sum of the squares of the minimum distances between red and blue tiles
         return (min_dist_r ** 2 + min_dist_q ** 2) ** 0.5
     
-    def get_my_power(self, board):
+    def get_my_power(self, board=None):
         '''Get the combined power of all player tiles on the board
-        This also requires a board parameter as often it is used for potential boards, and not the present board'''
+        This also takes a board parameter as often it is used for potential boards, and not the present board'''
+        if board is None or board is self._board:
+            return self._power[self.agentColor.value]
         my_power = 0
         for ((r, q), (player, k)) in board.items():
             if player == self.agentColor:
                 my_power += k
         return my_power
     
-    def get_opp_power(self, myColor, board):
+    def get_opp_power(self, myColor, board=None):
         '''Get the combined power of all opponent tiles on the board
-        This also requires a board parameter as often it is used for potential boards, and not the present board'''
+        This also takes a board parameter as often it is used for potential boards, and not the present board'''
+        if board is None or board is self._board:
+            return self._power[myColor.opponent.value]
         opp_power = 0
         for ((r, q), (player, k)) in board.items():
             if player != myColor:
@@ -355,33 +429,45 @@ class BoardState:
             if player != self.agentColor:
                 opp_tiles.append(((r, q), (player, k)))
         return opp_tiles
+
+    def get_red_tiles(self):
+        '''Gets all the red tiles on the board'''
+        return [((r, q), (player, k)) for ((r, q), (player, k)) in self.board.items() if player == PlayerColor.RED]
+
+    def get_blue_tiles(self):
+        '''Gets all the blue tiles on the board'''
+        return [((r, q), (player, k)) for ((r, q), (player, k)) in self.board.items() if player == PlayerColor.BLUE]
     
     def tiles_are_adjacent(self, r1, q1, r2, q2):
         '''Check if two tiles are adjacent to each other'''
-        dr, dq = self.get_r_q_distances_between_two_tiles(r1, q1, r2, q2)
-        if dr <= 1 and dq <= 1:
-            return True
-        return False
+        return ADJACENT[r1 * 7 + q1][r2 * 7 + q2]
     
     def red_tiles_are_adjacent_to_blue_tiles(self):
         '''Check if any of the red tiles on the board are adjacent to any of the blue tiles on the board'''
-        tiles = {"r": [], "b": []}
-        for ((r, q), (player, k)) in self.board.items():
-            tiles[player].append((r, q))
-        for (r1, q1) in tiles["r"]:
-            for (r2, q2) in tiles["b"]:
-                if self.tiles_are_adjacent(r1, q1, r2, q2):
+        board = self.board
+        for ((r, q), (player, k)) in board.items():
+            if player != PlayerColor.RED:
+                continue
+            for neighbour in NEIGHBOURS[r * 7 + q]:
+                tile = board.get(neighbour)
+                if tile is not None and tile[0] == PlayerColor.BLUE:
                     return True
         return False
     
     def get_highest_opp_tile_adjacent(self, board, myColour, my_tile: HexPos):
         '''Get the highest power opp tile that is adjacent to the given tile (of type Hex)'''
+        return self.highest_opp_power_adjacent(my_tile.r * 7 + my_tile.q, myColour, board)
+
+    def highest_opp_power_adjacent(self, cell, myColour, board=None):
+        '''Get the highest power opp tile adjacent to the cell with the given index, on the given board (the present
+        one by default). Only the (precomputed) adjacent cells are checked, rather than the whole board'''
+        if board is None:
+            board = self._board
         highest_power = 0
-        for ((r, q), (player, k)) in board.items():
-            if player != myColour:
-                if self.tiles_are_adjacent(my_tile.r, my_tile.q, r, q):
-                    if k > highest_power:
-                        highest_power = k
+        for adjacent in ADJACENT_CELLS[cell]:
+            tile = board.get(adjacent)
+            if tile is not None and tile[0] != myColour and tile[1] > highest_power:
+                highest_power = tile[1]
         return highest_power
 
     def red_power_higher_than_parent(self):
@@ -0,0 +1,24 @@
+# Boards encoded as 49-element arrays: positive power for RED tiles, negative power for BLUE tiles. MCTS plays its games
+# out on them, and the root-split pool sends them to its helpers.
+from referee.game import PlayerColor
+
+from .tables import NUM_CELLS, CELLS, CELL_INDEX
+
+
+def encode_board(board: dict):
+    '''Encode a dictionary board as a list of 49 signed powers: positive for RED tiles, negative for BLUE tiles'''
+    cells = [0] * NUM_CELLS
+    for (cell, (player, k)) in board.items():
+        cells[CELL_INDEX[cell]] = k if player == PlayerColor.RED else -k
+    return cells
+
+
+def decode_board(cells):
+    '''Turn an encoded board (see encode_board) back into a dictionary board'''
+    board = {}
+    for (i, k) in enumerate(cells):
+        if k > 0:
+            board[CELLS[i]] = (PlayerColor.RED, k)
+        elif k < 0:
+            board[CELLS[i]] = (PlayerColor.BLUE, -k)
+    return board
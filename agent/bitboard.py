@@ -0,0 +1,254 @@
+# A bitboard implementation of the agent's board state, for the make/unmake loops of the greedy strategies.
+# Each colour has a 49-bit occupancy mask, where bit i is set if cell i (r * 7 + q, as in tables.py) holds one of its
+# stacks, and the powers of all the stacks are kept in a 49-element list. Moves are found by walking the set bits of a
+# mask, rather than looking up every (r, q) key of a dictionary, and make_move / unmake_move / move_delta read and
+# write list entries by cell index. The power counters and Zobrist hash are kept up to date as in BoardState, from the
+# same keys, so a position hashes the same on either.
+#
+# It has the query surface that OneMoveStrategy2 and TwoMoveStrategy use. The threat map, group map and evaluation
+# features that the alpha-beta searches read are only kept on BoardState.
+from referee.game import PlayerColor
+
+from .agentboard import BoardState
+from .moves import FIRST_SPREAD, NUM_DIRECTIONS, MOVE_CELL, MOVE_DIR, MOVE_ACTIONS, encode_action
+from .tables import NUM_CELLS, MAX_POWER, CELLS, CELL_INDEX, ADJACENT, SPREAD_TARGET_INDICES, ZOBRIST_KEYS
+
+FULL_MASK = (1 << NUM_CELLS) - 1
+
+# Colours are turned into indices by identity with RED, as PlayerColor.value goes through the Enum machinery, which
+# costs more than the rest of move_delta
+RED = PlayerColor.RED
+
+# CELL_BITS[i] -> the mask with only bit i set
+CELL_BITS = [1 << i for i in range(NUM_CELLS)]
+
+# ADJACENT_MASKS[i] -> the mask of the cells within one row and one column of cell i (as in tables.ADJACENT)
+ADJACENT_MASKS = [sum(CELL_BITS[j] for j in range(NUM_CELLS) if ADJACENT[i][j]) for i in range(NUM_CELLS)]
+
+
+def mask_cells(mask):
+    '''Get the indices of the set bits of a mask, lowest first (which is grid order, as BoardState visits cells)'''
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+
+class BitBoardState:
+    '''
+    occupied[colour] is the occupancy mask of the stacks of each colour value, and powers[cell] is the power of the
+    stack on each cell (0 if empty). Moves are encoded moves (see moves.py), though make_move also takes Actions.
+    In debug mode, the masks, counters and hash are checked against a rescan after every move, as in BoardState.
+    '''
+
+    def __init__(self, board: dict, depth, agentColor: PlayerColor, debug=False):
+        '''board is a dictionary of (r, q) coordinates and (p, k) cell states, as in BoardState'''
+        self.depth = depth
+        self.agentColor = agentColor
+        self.debug = debug
+        self.occupied = [0, 0]
+        self.powers = [0] * NUM_CELLS
+        self._power = [0, 0]
+        self.hash = 0
+        # One entry per move applied with make_move, holding the previous (cell, colour value, power) of every cell
+        # the move touched
+        self.undo_stack = []
+        for (cell, (player, k)) in board.items():
+            self._set_cell(CELL_INDEX[cell], player.value, k)
+
+    @classmethod
+    def from_boardstate(cls, boardSt: BoardState):
+        '''Build a bitboard of the present board of a BoardState'''
+        return cls(boardSt.board, boardSt.depth, boardSt.agentColor, boardSt.debug)
+
+    def to_board(self):
+        '''Build the dictionary of (r, q) coordinates and (p, k) cell states for the present board'''
+        board = {}
+        for color in PlayerColor:
+            for cell in mask_cells(self.occupied[color.value]):
+                board[CELLS[cell]] = (color, self.powers[cell])
+        return board
+
+    def copy(self):
+        '''Return a copy of the present board, with no moves to undo'''
+        return BitBoardState(self.to_board(), self.depth, self.agentColor, self.debug)
+
+    def owner(self, cell):
+        '''Get the colour value of the stack on the cell with the given index (None if it is empty)'''
+        bit = CELL_BITS[cell]
+        if self.occupied[0] & bit:
+            return 0
+        if self.occupied[1] & bit:
+            return 1
+        return None
+
+    def verify_counters(self):
+        '''Check the masks, power counters and hash against a rescan of the powers list'''
+        assert self.occupied[0] & self.occupied[1] == 0, "a cell is occupied by both colours"
+        occupied = self.occupied[0] | self.occupied[1]
+        power = [0, 0]
+        hash = 0
+        for (cell, k) in enumerate(self.powers):
+            assert (k > 0) == bool(occupied & CELL_BITS[cell]), f"cell {cell} has power {k} but mask disagrees"
+            if k > 0:
+                color = self.owner(cell)
+                power[color] += k
+                hash ^= ZOBRIST_KEYS[cell][color][k]
+        assert self._power == power, f"power counters {self._power} do not match board {power}"
+        assert self.hash == hash, "hash does not match board"
+
+    def get_color_power(self, color: PlayerColor):
+        '''Get the combined power of all tiles of the given colour'''
+        return self._power[color.value]
+
+    def get_tile_count(self, color: PlayerColor):
+        '''Get the number of tiles of the given colour'''
+        return self.occupied[color.value].bit_count()
+
+    def get_total_power(self):
+        '''Get the total power of all tiles on the board'''
+        return self._power[0] + self._power[1]
+
+    def get_my_power(self):
+        '''Get the combined power of the board's agent's tiles'''
+        return self._power[self.agentColor.value]
+
+    def get_opp_power(self, myColor: PlayerColor):
+        '''Get the combined power of the tiles of the other colour to myColor'''
+        return self._power[1 - myColor.value]
+
+    def check_if_win(self, myColor: PlayerColor):
+        '''Check if the other colour to myColor has no power left'''
+        return self.get_opp_power(myColor) == 0
+
+    def get_encoded_spreadmoves(self, myColor: PlayerColor):
+        '''Return a list of every spread move of the given colour, as encoded moves, in grid order'''
+        spreadmoves = []
+        for cell in mask_cells(self.occupied[myColor.value]):
+            first = FIRST_SPREAD + cell * NUM_DIRECTIONS
+            spreadmoves += range(first, first + NUM_DIRECTIONS)
+        return spreadmoves
+
+    def get_encoded_spawnmoves(self):
+        '''Return a list of every spawn move (the empty cells), as encoded moves, in grid order'''
+        return mask_cells(FULL_MASK & ~(self.occupied[0] | self.occupied[1]))
+
+    def get_spreadmoves(self, myColor: PlayerColor):
+        '''Return a list of every spread move of the given colour, as referee Actions'''
+        return [MOVE_ACTIONS[move] for move in self.get_encoded_spreadmoves(myColor)]
+
+    def get_spawnmoves(self):
+        '''Return a list of every spawn move, as referee Actions'''
+        return [MOVE_ACTIONS[move] for move in self.get_encoded_spawnmoves()]
+
+    def highest_opp_power_adjacent(self, cell, myColour: PlayerColor):
+        '''Get the highest power of the other colour's tiles adjacent to the cell with the given index (0 if none)'''
+        powers = self.powers
+        return max((powers[i] for i in mask_cells(ADJACENT_MASKS[cell] & self.occupied[1 - myColour.value])),
+                   default=0)
+
+    def move_delta(self, move, playerColour: PlayerColor):
+        '''
+        Work out the effect of an encoded move by the given colour without playing it, as BoardState.move_delta does.
+        Returns (the change in the mover's power, the change in the opponent's power, whether the opponent has no
+        power left afterwards).
+        '''
+        color = 0 if playerColour is RED else 1
+        opp_power = self._power[1 - color]
+        if move < FIRST_SPREAD:
+            return (1, 0, opp_power == 0)
+
+        powers = self.powers
+        mask = self.occupied[color]
+        cell = MOVE_CELL[move]
+        power = powers[cell]
+        # The source stack is lifted off, and each target it lands on gains a power and changes to the mover's colour
+        mine = -power
+        theirs = 0
+        for target in SPREAD_TARGET_INDICES[cell][MOVE_DIR[move]][power - 1]:
+            k = powers[target]
+            if k == 0:
+                mine += 1
+                continue
+            if mask & CELL_BITS[target]:
+                mine -= k
+            else:
+                theirs -= k
+            # A stack at max power is emptied
+            if k < MAX_POWER:
+                mine += k + 1
+        return (mine, theirs, opp_power + theirs == 0)
+
+    def calculate_move_impact(self, move, playerColour: PlayerColor):
+        '''Calculate the net gain/loss of an encoded move, for the board's agent'''
+        (mine, theirs, _) = self.move_delta(move, playerColour)
+        return mine - theirs if playerColour == self.agentColor else theirs - mine
+
+    def calculate_move_opp_impact(self, move, myColour: PlayerColor):
+        '''Calculate the change in the opponent's power from an encoded move'''
+        return self.move_delta(move, myColour)[1]
+
+    def check_if_move_wins(self, move, myColor: PlayerColor):
+        '''Check if an encoded move leaves the opponent with no power, without playing it'''
+        return self.move_delta(move, myColor)[2]
+
+    def make_move(self, move, playerColour: PlayerColor):
+        '''Apply a move (either a referee Action or an encoded move) in place. It can be reverted with unmake_move'''
+        if type(move) is not int:
+            move = encode_action(move)
+        color = 0 if playerColour is RED else 1
+        powers = self.powers
+        set_cell = self._set_cell
+        cell = MOVE_CELL[move]
+
+        if move < FIRST_SPREAD:
+            changes = [(cell, self.owner(cell), powers[cell])]
+            set_cell(cell, color, 1)
+
+        else:
+            power = powers[cell]
+            changes = [(cell, color, power)]
+            set_cell(cell, color, 0)
+            for target in SPREAD_TARGET_INDICES[cell][MOVE_DIR[move]][power - 1]:
+                k = powers[target]
+                changes.append((target, self.owner(target), k))
+                # A stack at max power is emptied
+                set_cell(target, color, k + 1 if k < MAX_POWER else 0)
+
+        self.undo_stack.append(changes)
+        self.depth += 1
+        if self.debug:
+            self.verify_counters()
+
+    def unmake_move(self):
+        '''Revert the last move applied with make_move. Throws an IndexError if there are no moves to undo'''
+        if len(self.undo_stack) == 0:
+            raise IndexError("No moves to undo.")
+
+        for (cell, color, power) in reversed(self.undo_stack.pop()):
+            self._set_cell(cell, color, power)
+        self.depth -= 1
+        if self.debug:
+            self.verify_counters()
+
+    def _set_cell(self, cell, color, power):
+        '''Set the cell with the given index to a stack of the given colour value and power (a power of 0, or a colour
+        of None, empties it), keeping the masks, power counters and hash up to date'''
+        bit = CELL_BITS[cell]
+        keys = ZOBRIST_KEYS[cell]
+        occupied = self.occupied
+        prev = self.powers[cell]
+        if prev:
+            prev_color = 0 if occupied[0] & bit else 1
+            occupied[prev_color] ^= bit
+            self._power[prev_color] -= prev
+            self.hash ^= keys[prev_color][prev]
+        if power and color is not None:
+            occupied[color] |= bit
+            self._power[color] += power
+            self.hash ^= keys[color][power]
+            self.powers[cell] = power
+        else:
+            self.powers[cell] = 0
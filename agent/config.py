@@ -0,0 +1,42 @@
+# Settings of the agent that can be changed without editing code, read from environment variables when the agent is
+# loaded. The referee starts each agent in a subprocess that inherits the environment, so for example
+#     AGENT_DEBUG=1 python -m referee --time 60 agent_pvs agent
+# turns on the debug output of both agents.
+import os
+
+
+def _flag(name, default: bool):
+    '''Read a true/false setting. Unset means the default, and "0", "false", "no" and "off" mean False'''
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("", "0", "false", "no", "off")
+
+
+def _int(name, default: int):
+    '''Read a whole number setting. Unset (or not a number) means the default'''
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# Print a summary of each search (depth reached, score, nodes, time and principal variation) to stderr
+DEBUG = _flag("AGENT_DEBUG", False)
+
+# Selective search in the alpha-beta searchers (see search.py): late-move reductions of quiet moves ordered late, and
+# futility pruning of quiet moves at frontier nodes. Set AGENT_LMR=0 or AGENT_FUTILITY=0 to turn them off, for example
+# to play a game with and without them through the referee
+LMR = _flag("AGENT_LMR", True)
+FUTILITY = _flag("AGENT_FUTILITY", True)
+
+# Search on the opponent's time, in a background thread (see ponder.py). Off by default
+PONDER = _flag("AGENT_PONDER", False)
+
+# The number of processes searching in parallel, including the agent's own (see smp.py). 1 turns parallel search off
+WORKERS = _int("AGENT_WORKERS", 1)
+
+# Check the board's incrementally maintained counters, maps and evaluation features against a full rescan after every
+# move made or unmade, and at every evaluation (see BoardState.verify_counters and evaluation.verify_features). Very
+# slow; for testing changes to the board or the evaluation, for example with AGENT_VERIFY=1 python -m referee agent_pvs agent
+VERIFY = _flag("AGENT_VERIFY", False)
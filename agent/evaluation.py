@@ -0,0 +1,133 @@
+# Evaluation of positions for the agent's search.
+# A position is scored as a weighted sum of features. Each feature is the difference between the two colours in
+# something the board keeps up to date as moves are made and unmade (its power and tile counters, its ThreatMap and its
+# GroupMap), so scoring a leaf is a handful of reads, and the work of keeping the features current is spread over
+# make_move/unmake_move, in proportion to the cells each move touches. Every feature also has a from-scratch version,
+# which rescans the board, and on a BoardState in debug mode the two are compared at every evaluation.
+from referee.game import PlayerColor, MAX_TURNS, WIN_POWER_DIFF
+
+from .agentboard import BoardState
+from .tables import CELL_INDEX, NEIGHBOURS, SPREAD_TARGETS
+
+# The score of a won position. Wins found closer to the root score higher, so the search prefers the quickest win
+WIN_SCORE = 100000
+
+
+def power_difference(boardSt: BoardState, color: PlayerColor):
+    '''The difference in power between the given colour and the opponent, from the board's power counters'''
+    return boardSt.get_color_power(color) - boardSt.get_color_power(color.opponent)
+
+
+def tile_difference(boardSt: BoardState, color: PlayerColor):
+    '''The difference in the number of stacks, from the board's tile counters'''
+    return boardSt.get_tile_count(color) - boardSt.get_tile_count(color.opponent)
+
+
+def grouped_difference(boardSt: BoardState, color: PlayerColor):
+    '''The difference in the number of stacks with a neighbour of their own colour (which one spread can take
+    together), from the board's GroupMap. Fewer is better'''
+    groups = boardSt.groups
+    return groups.grouped_stacks(color.opponent) - groups.grouped_stacks(color)
+
+
+def threatened_difference(boardSt: BoardState, color: PlayerColor):
+    '''The difference in the number of stacks that the other colour can spread onto, from the board's ThreatMap.
+    Fewer is better'''
+    threats = boardSt.threats
+    return threats.threatened_stacks(color.opponent) - threats.threatened_stacks(color)
+
+
+def scan_power_difference(boardSt: BoardState, color: PlayerColor):
+    '''power_difference, from a full scan of the board'''
+    return sum(k if player == color else -k for (player, k) in boardSt.board.values())
+
+
+def scan_tile_difference(boardSt: BoardState, color: PlayerColor):
+    '''tile_difference, from a full scan of the board'''
+    return sum(1 if player == color else -1 for (player, _) in boardSt.board.values())
+
+
+def scan_grouped_difference(boardSt: BoardState, color: PlayerColor):
+    '''grouped_difference, from a full scan of the board'''
+    board = boardSt.board
+    difference = 0
+    for (cell, (player, _)) in board.items():
+        for neighbour in NEIGHBOURS[CELL_INDEX[cell]]:
+            tile = board.get(neighbour)
+            if tile is not None and tile[0] == player:
+                difference += -1 if player == color else 1
+                break
+    return difference
+
+
+def scan_threatened_difference(boardSt: BoardState, color: PlayerColor):
+    '''threatened_difference, from a full scan of the board: every spread of every stack'''
+    board = boardSt.board
+    threatened = set()
+    for (cell, (player, k)) in board.items():
+        for by_power in SPREAD_TARGETS[CELL_INDEX[cell]]:
+            for target in by_power[k - 1]:
+                tile = board.get(target)
+                if tile is not None and tile[0] != player:
+                    threatened.add(target)
+    return sum(1 if board[cell][0] != color else -1 for cell in threatened)
+
+
+# The features, as (name, incremental function, from-scratch function, weight). Every function scores the present
+# board from the point of view of the given colour.
+# Only the power difference is weighted for now: the search's margins (FUTILITY_MARGIN, the aspiration window and
+# quiescence's delta pruning) are in units of power, and scores are whole numbers, so the other features are there to
+# be weighed up rather than yet part of the score. A feature with a weight of 0 is never computed, and the GroupMap
+# is not built unless something reads it
+FEATURES = [
+    ("power", power_difference, scan_power_difference, 1),
+    ("tiles", tile_difference, scan_tile_difference, 0),
+    ("grouped", grouped_difference, scan_grouped_difference, 0),
+    ("threatened", threatened_difference, scan_threatened_difference, 0),
+]
+
+# The (function, weight) of each feature that counts towards the score
+WEIGHTED_FEATURES = [(feature, weight) for (_, feature, _, weight) in FEATURES if weight != 0]
+
+
+def evaluate(boardSt: BoardState, color: PlayerColor):
+    '''Score the present board from the point of view of the given colour: the weighted sum of the features'''
+    if boardSt.debug:
+        verify_features(boardSt, color)
+    score = 0
+    for (feature, weight) in WEIGHTED_FEATURES:
+        score += weight * feature(boardSt, color)
+    return score
+
+
+def feature_values(boardSt: BoardState, color: PlayerColor):
+    '''Get the value of every feature (weighted or not) for the given colour, as a dictionary by name'''
+    return {name: feature(boardSt, color) for (name, feature, _, _) in FEATURES}
+
+
+def verify_features(boardSt: BoardState, color: PlayerColor):
+    '''Check every feature's incrementally maintained value against its from-scratch version'''
+    for (name, feature, scan, _) in FEATURES:
+        (value, expected) = (feature(boardSt, color), scan(boardSt, color))
+        assert value == expected, f"feature {name} is {value} but the board scans as {expected}"
+
+
+def is_game_over(boardSt: BoardState):
+    '''Check if the game has ended on the present board, following the referee's rules. The depth of the board state is
+    the number of moves played so far'''
+    if boardSt.depth < 2:
+        return False
+    return (boardSt.depth >= MAX_TURNS
+            or boardSt.get_color_power(PlayerColor.RED) == 0
+            or boardSt.get_color_power(PlayerColor.BLUE) == 0)
+
+
+def terminal_score(boardSt: BoardState, color: PlayerColor, ply):
+    '''Score a finished game from the point of view of the given colour, where ply is the distance from the root. The
+    referee decides the winner by power alone'''
+    diff = power_difference(boardSt, color)
+    if diff >= WIN_POWER_DIFF:
+        return WIN_SCORE - ply
+    if diff <= -WIN_POWER_DIFF:
+        return -WIN_SCORE + ply
+    return 0
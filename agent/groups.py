@@ -0,0 +1,72 @@
+# An incrementally maintained map of groups: for each cell, how many of its neighbours hold stacks of each colour.
+# Stacks with a neighbour of their own colour are likely to be taken together by one spread (see
+# BoardState.get_linear_blue_groupings), and the number of them is kept up to date as cells change, rather than found by
+# checking the neighbours of every stack on the board.
+from referee.game import PlayerColor
+
+from .tables import NUM_CELLS, CELL_INDEX, NEIGHBOUR_INDICES
+
+
+class GroupMap:
+    '''
+    counts[colour][cell] is the number of the cell's neighbours that hold a stack of that colour, owners[cell] is the
+    colour value of the stack on the cell (None if empty), and grouped[colour] is the number of that colour's stacks
+    with at least one neighbour of the same colour. Only a cell's colour matters, so changes of power are free.
+    '''
+
+    def __init__(self):
+        self.counts = [[0] * NUM_CELLS, [0] * NUM_CELLS]
+        self.owners = [None] * NUM_CELLS
+        self.grouped = [0, 0]
+
+    @classmethod
+    def from_board(cls, board: dict):
+        '''Build a group map from a dictionary of (r, q) coordinates and (p, k) cell states'''
+        groups = cls()
+        for (cell, tile) in board.items():
+            groups.update(CELL_INDEX[cell], None, tile)
+        return groups
+
+    def add_stack(self, cell, color):
+        '''Add a stack of the given colour value on the cell with the given index, which must be empty'''
+        counts = self.counts[color]
+        owners = self.owners
+        owners[cell] = color
+        if counts[cell] > 0:
+            self.grouped[color] += 1
+        for neighbour in NEIGHBOUR_INDICES[cell]:
+            counts[neighbour] += 1
+            # A neighbour of the same colour is now grouped, if this is its first such neighbour
+            if counts[neighbour] == 1 and owners[neighbour] == color:
+                self.grouped[color] += 1
+
+    def remove_stack(self, cell, color):
+        '''Remove the stack of the given colour value from the cell with the given index'''
+        counts = self.counts[color]
+        owners = self.owners
+        owners[cell] = None
+        if counts[cell] > 0:
+            self.grouped[color] -= 1
+        for neighbour in NEIGHBOUR_INDICES[cell]:
+            counts[neighbour] -= 1
+            if counts[neighbour] == 0 and owners[neighbour] == color:
+                self.grouped[color] -= 1
+
+    def update(self, cell, prev, tile):
+        '''Update the map for a cell changing from the prev (p, k) state to the new one (either may be None)'''
+        prev_color = None if prev is None else prev[0].value
+        color = None if tile is None else tile[0].value
+        if prev_color == color:
+            return
+        if prev_color is not None:
+            self.remove_stack(cell, prev_color)
+        if color is not None:
+            self.add_stack(cell, color)
+
+    def grouped_stacks(self, color: PlayerColor):
+        '''Get the number of stacks of the given colour with a neighbour of the same colour'''
+        return self.grouped[color.value]
+
+    def __eq__(self, other):
+        return (isinstance(other, GroupMap) and self.counts == other.counts and self.owners == other.owners
+                and self.grouped == other.grouped)
@@ -0,0 +1,281 @@
+# Monte-Carlo tree search for the agent.
+# The tree is stored as parallel arrays indexed by node number (no per-node objects), and the games are played out
+# on a plain 49-element array board (positive power for RED stacks, negative for BLUE, as in arrayboard.py) rather
+# than on BoardState objects, so each iteration costs little more than the moves it plays.
+import math
+import random
+import time
+from array import array
+
+from referee.game import PlayerColor, MAX_TURNS, MAX_TOTAL_POWER, WIN_POWER_DIFF
+
+from .agentboard import BoardState
+from .arrayboard import encode_board
+from .moves import FIRST_SPREAD, NUM_DIRECTIONS, MOVE_CELL, MOVE_DIR, spread_move
+from .tables import NUM_CELLS, MAX_POWER, SPREAD_TARGET_INDICES
+
+# The exploration constant of UCT
+EXPLORATION = 1.4
+
+# Playouts stop after this many moves, and are then scored by the power difference, as if the game ended there
+ROLLOUT_LIMIT = 40
+
+# How many iterations are run between checks of the clock
+CHECK_INTERVAL = 16
+
+
+def play(cells, move, sign, red, blue):
+    '''Play an encoded move on an array board, where sign is 1 for a RED move and -1 for a BLUE one. Returns the new
+    (RED power, BLUE power), given the powers before the move'''
+    if move < FIRST_SPREAD:
+        cells[move] = sign
+        return (red + 1, blue) if sign > 0 else (red, blue + 1)
+    source = MOVE_CELL[move]
+    k = cells[source] * sign
+    cells[source] = 0
+    # The mover's power is unchanged apart from stacks pushed past MAX_POWER, and each captured stack changes sides
+    gained = 0
+    lost = 0
+    for target in SPREAD_TARGET_INDICES[source][MOVE_DIR[move]][k - 1]:
+        p = cells[target] * sign
+        if p < 0:
+            lost -= p
+            p = -p
+        if p < MAX_POWER:
+            cells[target] = (p + 1) * sign
+        else:
+            cells[target] = 0
+            gained -= MAX_POWER + 1
+    gained += lost
+    return (red + gained, blue - lost) if sign > 0 else (red - lost, blue + gained)
+
+
+def legal_moves(cells, sign, total):
+    '''Get every legal encoded move on an array board, given the total power on it. Captures come first'''
+    captures = []
+    others = []
+    for cell in range(NUM_CELLS):
+        p = cells[cell] * sign
+        if p > 0:
+            targets = SPREAD_TARGET_INDICES[cell]
+            for dir in range(NUM_DIRECTIONS):
+                move = spread_move(cell, dir)
+                for target in targets[dir][p - 1]:
+                    if cells[target] * sign < 0:
+                        captures.append(move)
+                        break
+                else:
+                    others.append(move)
+        elif p == 0 and total < MAX_TOTAL_POWER:
+            others.append(cell)
+    return captures, others
+
+
+def game_result(red, blue):
+    '''Score a finished (or abandoned) playout for RED: 1 for a win, 0 for a loss and 0.5 for a draw'''
+    if red - blue >= WIN_POWER_DIFF:
+        return 1.0
+    if blue - red >= WIN_POWER_DIFF:
+        return 0.0
+    return 0.5
+
+
+def is_over(turn, red, blue):
+    '''Check if the game has ended after the given number of turns, following the referee's rules'''
+    return turn >= 2 and (turn >= MAX_TURNS or red == 0 or blue == 0)
+
+
+class MCTS:
+    '''
+    UCT search. Node 0 is the root. For each node, move is the encoded move that leads to it, parent is its parent's
+    number, first_child and num_children give the range of its children (num_children is -1 until it is expanded),
+    and visits and red_wins count the playouts through it and how many RED won (draws count half).
+    '''
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.iterations = 0
+        self.reset()
+
+    def reset(self):
+        '''Empty the tree'''
+        self.root_key = None
+        self.move = array('h')
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.num_children = array('i')
+        self.visits = array('i')
+        self.red_wins = array('d')
+
+    def add_node(self, move, parent):
+        '''Add an unexpanded node to the tree, returning its number'''
+        self.move.append(move)
+        self.parent.append(parent)
+        self.first_child.append(0)
+        self.num_children.append(-1)
+        self.visits.append(0)
+        self.red_wins.append(0.0)
+        return len(self.move) - 1
+
+    def search(self, boardSt: BoardState, color: PlayerColor, deadline=None, max_iterations=None):
+        '''
+        Run iterations from the given position until the deadline (a time.process_time() value) passes or the
+        iteration limit is reached, whichever is first. At least one iteration is always run. If the tree is already
+        rooted at this position (see advance), its playouts are built on rather than thrown away. Returns the move of
+        the most visited child of the root, or None if there are no legal moves.
+        '''
+        if not self.matches(boardSt, color):
+            self.reset()
+            self.add_node(-1, -1)
+            self.root_key = self.position_key(boardSt, color)
+        self.iterations = 0
+        root_cells = encode_board(boardSt.board)
+        root_sign = 1 if color == PlayerColor.RED else -1
+        root_powers = (boardSt.get_color_power(PlayerColor.RED), boardSt.get_color_power(PlayerColor.BLUE))
+
+        while True:
+            self.iterate(root_cells, root_sign, root_powers, boardSt.depth)
+            self.iterations += 1
+            if max_iterations is not None and self.iterations >= max_iterations:
+                break
+            if deadline is not None and self.iterations % CHECK_INTERVAL == 0 and time.process_time() >= deadline:
+                break
+        return self.best_move()
+
+    @staticmethod
+    def position_key(boardSt: BoardState, color: PlayerColor):
+        '''Identify a position by its board, the colour to move and the turn (which decides when the game ends)'''
+        return (boardSt.hash, color, boardSt.depth)
+
+    def matches(self, boardSt: BoardState, color: PlayerColor):
+        '''Check if the tree is rooted at the given position'''
+        return self.root_key is not None and self.root_key == self.position_key(boardSt, color)
+
+    def advance(self, move, boardSt: BoardState, color: PlayerColor):
+        '''
+        Re-root the tree at the child reached by the given move, where boardSt (with the given colour to move) is the
+        position after it. Nodes outside the child's subtree are discarded and the rest are renumbered, breadth first,
+        into new arrays. If the move was never expanded, the tree is emptied.
+        '''
+        child = -1
+        if self.root_key is not None and self.num_children[0] > 0:
+            first = self.first_child[0]
+            for node in range(first, first + self.num_children[0]):
+                if self.move[node] == move:
+                    child = node
+                    break
+        if child < 0 or self.num_children[child] < 0 and self.visits[child] == 0:
+            self.reset()
+            return
+
+        (old_move, old_first, old_count) = (self.move, self.first_child, self.num_children)
+        (old_visits, old_wins) = (self.visits, self.red_wins)
+        self.reset()
+        self.add_node(-1, -1)
+        self.visits[0] = old_visits[child]
+        self.red_wins[0] = old_wins[child]
+        # old_nodes[i] is the old number of new node i. Each node's children are copied as one block, so their numbers
+        # stay contiguous
+        old_nodes = [child]
+        i = 0
+        while i < len(old_nodes):
+            old = old_nodes[i]
+            count = old_count[old]
+            self.num_children[i] = count
+            if count > 0:
+                self.first_child[i] = len(self.move)
+                start = old_first[old]
+                for c in range(start, start + count):
+                    self.add_node(old_move[c], i)
+                    self.visits[-1] = old_visits[c]
+                    self.red_wins[-1] = old_wins[c]
+                    old_nodes.append(c)
+            i += 1
+        self.root_key = self.position_key(boardSt, color)
+
+    def best_move(self):
+        '''Get the move of the most visited child of the root'''
+        if self.num_children[0] <= 0:
+            return None
+        first = self.first_child[0]
+        best = max(range(first, first + self.num_children[0]), key=self.visits.__getitem__)
+        return self.move[best]
+
+    def iterate(self, root_cells, root_sign, root_powers, root_turn):
+        '''Run one iteration: select a path down the tree, expand its leaf, play out a game and back up the result'''
+        cells = root_cells.copy()
+        sign = root_sign
+        (red, blue) = root_powers
+        turn = root_turn
+        node = 0
+
+        # Selection: descend by UCT through expanded nodes
+        while self.num_children[node] > 0 and not is_over(turn, red, blue):
+            node = self.select_child(node, sign)
+            (red, blue) = play(cells, self.move[node], sign, red, blue)
+            sign = -sign
+            turn += 1
+
+        # Expansion: add every child of the leaf, and step into the first (captures first, otherwise in random order)
+        if self.num_children[node] < 0 and not is_over(turn, red, blue):
+            (captures, others) = legal_moves(cells, sign, red + blue)
+            self.rng.shuffle(captures)
+            self.rng.shuffle(others)
+            moves = captures + others
+            self.first_child[node] = len(self.move)
+            self.num_children[node] = len(moves)
+            for move in moves:
+                self.add_node(move, node)
+            if moves:
+                node = self.first_child[node]
+                (red, blue) = play(cells, self.move[node], sign, red, blue)
+                sign = -sign
+                turn += 1
+
+        # Simulation and backpropagation
+        result = self.rollout(cells, sign, red, blue, turn)
+        while node >= 0:
+            self.visits[node] += 1
+            self.red_wins[node] += result
+            node = self.parent[node]
+
+    def select_child(self, node, sign):
+        '''Pick the child of a node (with the given colour to move) with the highest UCT value. Unvisited children are
+        picked first, in order'''
+        first = self.first_child[node]
+        visits = self.visits
+        red_wins = self.red_wins
+        scale = EXPLORATION * math.sqrt(math.log(visits[node]))
+        best = first
+        best_value = -1.0
+        for child in range(first, first + self.num_children[node]):
+            n = visits[child]
+            if n == 0:
+                return child
+            win_rate = red_wins[child] / n
+            if sign < 0:
+                win_rate = 1 - win_rate
+            value = win_rate + scale / math.sqrt(n)
+            if value > best_value:
+                best = child
+                best_value = value
+        return best
+
+    def rollout(self, cells, sign, red, blue, turn):
+        '''Play out a game from an array board with a cheap default policy: a random capture if there is one,
+        otherwise a random move. Returns the result for RED'''
+        rng = self.rng
+        for _ in range(ROLLOUT_LIMIT):
+            if is_over(turn, red, blue):
+                break
+            (captures, others) = legal_moves(cells, sign, red + blue)
+            if captures:
+                move = captures[rng.randrange(len(captures))]
+            elif others:
+                move = others[rng.randrange(len(others))]
+            else:
+                break
+            (red, blue) = play(cells, move, sign, red, blue)
+            sign = -sign
+            turn += 1
+        return game_result(red, blue)
@@ -0,0 +1,53 @@
+# A compact integer encoding of moves, used throughout the agent's search.
+# Moves 0-48 spawn on the cell with that index, and moves 49-342 spread from cell (m - 49) // 6 in direction
+# (m - 49) % 6. Every move maps to a precomputed referee Action, so Actions (and the HexPos bounds check in their
+# constructor) are only needed at the root, when the agent returns its move to the referee.
+from referee.game import SpawnAction, SpreadAction, HexPos
+
+from .tables import NUM_CELLS, CELLS, CELL_INDEX, DIRECTIONS, DIR_INDEX
+
+NUM_DIRECTIONS = len(DIRECTIONS)
+FIRST_SPREAD = NUM_CELLS
+NUM_MOVES = NUM_CELLS + NUM_CELLS * NUM_DIRECTIONS
+
+
+def spawn_move(cell):
+    '''Encode a spawn on the cell with the given index'''
+    return cell
+
+
+def spread_move(cell, dir):
+    '''Encode a spread from the cell with the given index, in the direction with the given index'''
+    return FIRST_SPREAD + cell * NUM_DIRECTIONS + dir
+
+
+# MOVE_CELL[m] -> the index of the cell a move spawns on or spreads from
+MOVE_CELL = list(range(NUM_CELLS)) + [cell for cell in range(NUM_CELLS) for _ in range(NUM_DIRECTIONS)]
+
+# MOVE_DIR[m] -> the direction index of a spread, or -1 for a spawn
+MOVE_DIR = [-1] * NUM_CELLS + [dir for _ in range(NUM_CELLS) for dir in range(NUM_DIRECTIONS)]
+
+# MOVE_ACTIONS[m] -> the referee Action for a move
+MOVE_ACTIONS = [SpawnAction(HexPos(*cell)) for cell in CELLS] + [
+    SpreadAction(HexPos(*cell), dir) for cell in CELLS for dir in DIRECTIONS
+]
+
+
+def is_spawn(move):
+    '''Check if an encoded move is a spawn'''
+    return move < FIRST_SPREAD
+
+
+def decode_move(move):
+    '''Convert an encoded move to a referee Action'''
+    return MOVE_ACTIONS[move]
+
+
+def encode_action(action):
+    '''Convert a referee Action to an encoded move'''
+    match action:
+        case SpawnAction(cell):
+            return spawn_move(CELL_INDEX[(cell.r, cell.q)])
+        case SpreadAction(cell, direction):
+            return spread_move(CELL_INDEX[(cell.r, cell.q)], DIR_INDEX[direction])
+    raise ValueError(f"Unknown move {action}")
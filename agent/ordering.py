@@ -0,0 +1,84 @@
+# Move ordering for the agent's search.
+# Alpha-beta prunes the most when the best move is searched first. Moves are ordered by: the transposition table's
+# best move, then captures (by how much of the opponent's power they take), then the killer moves of the ply, then
+# every other move by its history score.
+from referee.game import PlayerColor
+
+from .moves import NUM_MOVES, FIRST_SPREAD, MOVE_CELL, MOVE_DIR
+from .tables import CELLS, SPREAD_TARGETS
+
+# The number of killer moves remembered for each ply
+NUM_KILLERS = 2
+
+# The deepest ply that killer moves are kept for
+MAX_PLY = 128
+
+# Sort keys of each class of move. Captures score CAPTURE_SCORE plus the power taken, killers score KILLER_SCORE
+# minus their slot, and history scores are kept below HISTORY_MAX, so the classes never overlap
+HASH_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 20
+KILLER_SCORE = 1 << 19
+HISTORY_MAX = 1 << 18
+
+
+def captured_power(board: dict, move, color: PlayerColor):
+    '''Get the total power of the opponent's stacks that a move by the given colour takes over (0 for spawns). The
+    targets of the spread come from the precomputed SPREAD_TARGETS table'''
+    if move < FIRST_SPREAD:
+        return 0
+    cell = MOVE_CELL[move]
+    captured = 0
+    for target in SPREAD_TARGETS[cell][MOVE_DIR[move]][board[CELLS[cell]][1] - 1]:
+        tile = board.get(target)
+        if tile is not None and tile[0] != color:
+            captured += tile[1]
+    return captured
+
+
+class MoveOrderer:
+    '''
+    Orders the moves of each node. The killer moves (non-captures that caused a cutoff at the same ply) and the history
+    table (how much each non-capture has caused cutoffs, indexed by encoded move) are learned as the search runs.
+    '''
+
+    def __init__(self):
+        self.killers = [[None] * NUM_KILLERS for _ in range(MAX_PLY)]
+        self.history = [0] * NUM_MOVES
+
+    def new_search(self):
+        '''Prepare for a new search. Killers are forgotten, and history is aged so recent cutoffs count for more'''
+        for killers in self.killers:
+            killers[:] = [None] * NUM_KILLERS
+        self.history = [score >> 1 for score in self.history]
+
+    def order(self, board: dict, moves, color: PlayerColor, ply, hash_move=None):
+        '''Sort a list of encoded moves in place, in the order they should be searched'''
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        history = self.history
+        scores = {}
+        for move in moves:
+            captured = captured_power(board, move, color)
+            if captured > 0:
+                scores[move] = CAPTURE_SCORE + captured
+            elif move in killers:
+                scores[move] = KILLER_SCORE - killers.index(move)
+            else:
+                scores[move] = history[move]
+        if hash_move is not None and hash_move in scores:
+            scores[hash_move] = HASH_SCORE
+        moves.sort(key=scores.__getitem__, reverse=True)
+        return moves
+
+    def record_cutoff(self, board: dict, move, color: PlayerColor, ply, depth):
+        '''Learn from a move that caused a beta cutoff. Captures are already searched early, so only quiet moves are
+        recorded'''
+        if captured_power(board, move, color) > 0:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1:] = killers[:-1]
+                killers[0] = move
+        self.history[move] += depth * depth
+        if self.history[move] >= HISTORY_MAX:
+            self.history = [score >> 1 for score in self.history]
@@ -0,0 +1,149 @@
+# Pondering: searching on the opponent's time.
+# After our move, a background thread plays the reply we expect from the opponent on a copy of the board, and searches
+# the position we would face after it. The thread shares the strategy's transposition table, so if the opponent does
+# play the expected reply (a ponder hit), the search on our next turn starts from the work already done.
+#
+# The referee's CountdownTimer (referee/agent/resources.py) measures time.process_time(), the CPU time of the whole
+# process, and only inside its calls to the agent. Pondering between calls is not counted against us, but any that
+# overlaps one of our calls is, so the thread is stopped as soon as the opponent's move is reported to turn().
+#
+# The referee's MemoryWatcher measures the peak virtual memory of the process (VmPeak), and a thread adds to that its
+# stack, and (with glibc) a malloc arena of its own. Both are cut down here, and the strategy only ponders if what is
+# left fits in the space the referee allows.
+import ctypes
+import threading
+import time
+
+from referee.game import PlayerColor
+
+from .agentboard import BoardState
+from .evaluation import is_game_over
+from .search import Searcher
+
+# The stack size of the pondering thread. By default a thread's stack is as large as the shell's stack limit (usually
+# 8 MB), all of it counted by the referee. Python 3.11 calls Python functions without recursing in C, so however deep
+# the search goes it needs little C stack
+STACK_SIZE = 256 * 1024
+
+# The virtual memory glibc reserves for the malloc arena it gives a new thread: a 64 MB heap, mapped as 128 MB and then
+# trimmed, which still shows in VmPeak
+ARENA_RESERVE = 128 * 1024 * 1024
+
+# glibc's mallopt() parameter for the most malloc arenas the process may have
+M_ARENA_MAX = -8
+
+# The fraction of the space (as reported by the referee) that the pondering thread may add
+SPACE_FRACTION = 0.25
+
+
+def limit_malloc_arenas():
+    '''
+    Make every thread allocate from glibc's main malloc arena, rather than giving new threads arenas of their own.
+    Returns True if it worked, which needs glibc (reached through ctypes).
+    '''
+    try:
+        return ctypes.CDLL(None).mallopt(M_ARENA_MAX, 1) == 1
+    except (OSError, AttributeError, TypeError):
+        return False
+
+
+class Ponderer:
+    '''
+    Runs a Searcher in a background thread. Only one thread searches at a time: start() is called after our move has
+    been played, and stop() when the opponent's move is known, before the strategy searches again.
+    '''
+
+    def __init__(self, searcher: Searcher):
+        self.searcher = searcher
+        self.thread = None
+        self.predicted = None
+        self.result = None
+
+        # Statistics, over the whole game
+        self.ponders = 0
+        self.hits = 0
+        self.nodes = 0
+        self.cpu_time = 0.0
+        self.stop_time = 0.0
+
+    @classmethod
+    def from_referee(cls, searcher: Searcher, **referee: dict):
+        '''
+        Create a Ponderer for the searcher, if the pondering thread fits in SPACE_FRACTION of the space_remaining /
+        space_limit (in MB) that the referee passes to the agent. Returns None if it does not.
+        '''
+        space_mb = referee.get("space_remaining") or referee.get("space_limit")
+        needed = cls.thread_space(limit_malloc_arenas())
+        if space_mb is not None and needed > space_mb * SPACE_FRACTION * 1024 * 1024:
+            return None
+        return cls(searcher)
+
+    @staticmethod
+    def thread_space(arenas_limited):
+        '''Get the virtual memory (in bytes) that starting the pondering thread adds to the process'''
+        return STACK_SIZE if arenas_limited else STACK_SIZE + ARENA_RESERVE
+
+    def start(self, boardSt: BoardState, color: PlayerColor):
+        '''Start pondering the position after the expected reply of the given colour (the opponent, to move)'''
+        self.stop()
+        if is_game_over(boardSt):
+            return
+        self.predicted = self.predict_reply(boardSt, color)
+        if self.predicted is None:
+            return
+        board = boardSt.copy()
+        board.make_move(self.predicted, color)
+        if is_game_over(board):
+            return
+
+        self.result = None
+        self.searcher.stopped = False
+        self.thread = threading.Thread(target=self.run, args=(board, color.opponent), daemon=True)
+        self.ponders += 1
+        # The stack size is a setting of the threading module, read as each thread starts
+        previous = threading.stack_size(STACK_SIZE)
+        try:
+            self.thread.start()
+        finally:
+            threading.stack_size(previous)
+
+    def predict_reply(self, boardSt: BoardState, color: PlayerColor):
+        '''Predict the reply of the given colour: the transposition table's best move for the position, or failing
+        that, the move with the best immediate outcome'''
+        entry = self.searcher.tt.probe(self.searcher.key(boardSt, color))
+        if entry is not None and entry[4] is not None:
+            return entry[4]
+        moves = self.searcher.order_root_moves(boardSt, color)
+        return moves[0] if moves else None
+
+    def run(self, board: BoardState, color: PlayerColor):
+        '''The body of the pondering thread. It searches without a deadline, until the search ends or is stopped'''
+        start = time.thread_time()
+        try:
+            self.result = self.searcher.search(board, color)
+        finally:
+            self.nodes += self.searcher.nodes
+            self.cpu_time += time.thread_time() - start
+
+    def stop(self, move=None):
+        '''
+        Stop pondering, given the move the opponent actually played (an encoded move). Returns True for a ponder hit,
+        when the move was the one predicted and the work is kept in the transposition table, False for a miss, and None
+        if nothing was being pondered.
+        '''
+        if self.thread is None:
+            return None
+        start = time.process_time()
+        self.searcher.stopped = True
+        self.thread.join()
+        self.stop_time += time.process_time() - start
+        self.thread = None
+        if move is None:
+            return None
+        hit = move == self.predicted
+        self.hits += hit
+        return hit
+
+    def hit_rate(self):
+        '''Get the fraction of ponders that were hits'''
+        return self.hits / self.ponders if self.ponders else 0.0
@@ -0,0 +1,68 @@
+# Root splitting for TwoMoveStrategy.
+# Each of TwoMoveStrategy's candidate moves is scored on its own (our move, the opponent's predicted reply, then our
+# best follow-up), so the candidates can be shared out between processes with no communication while they work. Each
+# process is sent the board encoded as 49 signed powers (see arrayboard.encode_board) and its share of the candidates,
+# and sends back their scores. The scores are then merged in the original candidate order, by the same rules as the
+# serial loop, so the move chosen is the same however many processes there are.
+#
+# As with smp.py, the helpers' CPU time is not counted by the referee, and only helps when there are spare cores.
+import atexit
+import time
+from array import array
+
+from .agentboard import BoardState
+from .arrayboard import encode_board, decode_board
+from .smp import start_helper, stop_helpers
+
+
+def _helper(conn, strategy):
+    '''
+    The body of a helper process. It waits for (cells, turn, moves, budget) requests, scores the moves with the
+    strategy's evaluate_moves() until its own CPU time budget runs out, and replies with the scores. None ends the
+    process.
+    '''
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        (cells, turn, moves, budget) = request
+        boardSt = BoardState(decode_board(cells), [], turn, strategy._color)
+        deadline = None if budget is None else time.process_time() + budget
+        conn.send(strategy.evaluate_moves(boardSt, moves, deadline))
+
+
+class RootSplitPool:
+    '''
+    The strategy's own process and a pool of helper processes, which share out the candidates of each move. Candidate
+    i goes to process i % workers (process 0 is this one), so each process gets a spread of early and late candidates.
+    '''
+
+    def __init__(self, workers, strategy):
+        self.strategy = strategy
+        self.workers = workers
+        self.helpers = [start_helper(_helper, strategy) for _ in range(1, workers)]
+        atexit.register(self.close)
+
+    def evaluate_moves(self, boardSt: BoardState, moves, deadline=None):
+        '''
+        Score every move, as the strategy's evaluate_moves() would, with the work shared between the processes. The
+        deadline is a time.process_time() value in this process. Returns a list of scores in the order of moves, with
+        None for moves no process reached before the deadline (as distinct from LOSING_MOVE).
+        '''
+        budget = None if deadline is None else deadline - time.process_time()
+        cells = array('b', encode_board(boardSt.board))
+        for (index, (_, conn)) in enumerate(self.helpers, 1):
+            conn.send((cells, boardSt.depth, moves[index::self.workers], budget))
+
+        results = [None] * len(moves)
+        scores = self.strategy.evaluate_moves(boardSt, moves[0::self.workers], deadline)
+        results[0:len(scores) * self.workers:self.workers] = scores
+        for (index, (_, conn)) in enumerate(self.helpers, 1):
+            scores = conn.recv()
+            results[index:index + len(scores) * self.workers:self.workers] = scores
+        return results
+
+    def close(self):
+        '''Stop the helpers'''
+        stop_helpers(self.helpers)
+        self.helpers = []
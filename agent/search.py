@@ -0,0 +1,384 @@
+# The agent's game tree search: negamax alpha-beta with iterative deepening and a transposition table.
+# The search walks the tree on the one BoardState, with make_move / unmake_move, and works with encoded moves
+# (see moves.py) throughout.
+import time
+
+from referee.game import PlayerColor, MAX_TOTAL_POWER, MAX_TURNS
+
+from .agentboard import BoardState
+from .config import LMR, FUTILITY
+from .ordering import MoveOrderer, MAX_PLY, captured_power
+from .evaluation import WIN_SCORE, evaluate, is_game_over, terminal_score
+from .tables import ZOBRIST_TO_MOVE
+from .transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+INFINITY = WIN_SCORE + 1
+
+# The deepest iteration that iterative deepening will start
+MAX_DEPTH = 64
+
+# The most captures that the quiescence search plays out beyond the end of the main search
+MAX_QUIESCENCE_DEPTH = 8
+
+# Late-move reductions: at nodes at least LMR_MIN_DEPTH from the horizon, quiet moves from the LMR_MIN_INDEX'th on are
+# searched one ply less deep, and from the LMR_DEEP_INDEX'th on two plies less
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 4
+LMR_DEEP_INDEX = 16
+
+# The most that a quiet move (a spawn, or a spread that captures nothing) can add to the power difference
+FUTILITY_MARGIN = 1
+
+# How many times longer each iteration of deepening is assumed to take than the last, until two have been timed, and
+# the most it is ever assumed to take
+ITERATION_GROWTH = 4
+MAX_ITERATION_GROWTH = 20
+
+# How many nodes are searched between checks of the clock
+CHECK_INTERVAL = 256
+
+
+class SearchTimeout(Exception):
+    '''Raised inside the search when the hard deadline passes (or it is stopped), to unwind back to the root'''
+
+
+class Searcher:
+    '''
+    Negamax alpha-beta search. Scores are always from the point of view of the colour to move. The transposition table
+    is kept between searches, so later moves can reuse the work of earlier ones.
+    '''
+
+    def __init__(self, tt: TranspositionTable, lmr=LMR, futility=FUTILITY):
+        self.tt = tt
+        self.orderer = MoveOrderer()
+        self.lmr = lmr
+        self.futility = futility
+        self.nodes = 0
+        self.stopped = False
+        self.reductions_failed = 0
+        self.futility_prunes = 0
+        self.hard_deadline = None
+
+    def search(self, boardSt: BoardState, color: PlayerColor, soft_deadline=None, hard_deadline=None,
+               max_depth=MAX_DEPTH, start_depth=1):
+        '''
+        Search the position with the given colour to move, deepening one ply at a time from start_depth. A new iteration
+        is only started before the soft deadline, and the search is abandoned at the hard deadline (both are
+        time.process_time() values, or None for no limit). Returns (move, score, depth) for the last iteration that
+        finished. If none did, the move with the best immediate outcome is returned with a depth of 0.
+        '''
+        self.nodes = 0
+        self.reductions_failed = 0
+        self.futility_prunes = 0
+        self.hard_deadline = hard_deadline
+        self.orderer.new_search()
+        root_moves = self.order_root_moves(boardSt, color)
+        if len(root_moves) == 0:
+            return None, evaluate(boardSt, color), 0
+
+        best = (root_moves[0], None, 0)
+        root_undo = len(boardSt.undo_stack)
+        iteration_times = []
+        for depth in range(start_depth, max_depth + 1):
+            iteration_start = time.process_time()
+            try:
+                (score, move) = self.iterate(boardSt, color, depth, root_moves, best[1])
+            except SearchTimeout:
+                # Unwind the moves that were being searched when the deadline passed
+                while len(boardSt.undo_stack) > root_undo:
+                    boardSt.unmake_move()
+                break
+
+            best = (move, score, depth)
+            # Search the best move first in the next iteration
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+
+            if abs(score) >= WIN_SCORE - MAX_DEPTH:
+                break
+            now = time.process_time()
+            if soft_deadline is not None and now >= soft_deadline:
+                break
+            # Don't start an iteration that would be abandoned at the hard deadline anyway. Each iteration is expected
+            # to take as many times longer than the last as the last did than the one before
+            iteration_times.append(now - iteration_start)
+            if hard_deadline is not None and now + self.next_iteration_time(iteration_times) >= hard_deadline:
+                break
+        return best
+
+    @staticmethod
+    def next_iteration_time(iteration_times):
+        '''Estimate how long the next iteration of deepening will take, from how long the previous ones took'''
+        if len(iteration_times) < 2 or iteration_times[-2] <= 0:
+            return iteration_times[-1] * ITERATION_GROWTH
+        return iteration_times[-1] * min(max(iteration_times[-1] / iteration_times[-2], 1), MAX_ITERATION_GROWTH)
+
+    def iterate(self, boardSt: BoardState, color: PlayerColor, depth, root_moves, prev_score):
+        '''Run one iteration of deepening, returning (score, best move). prev_score is the score of the last iteration
+        (None before the first one)'''
+        return self.search_root(boardSt, color, depth, root_moves, -INFINITY, INFINITY)
+
+    def search_root(self, boardSt: BoardState, color: PlayerColor, depth, root_moves, alpha, beta):
+        '''Search every root move to the given depth within the (alpha, beta) window, returning (score, best move)'''
+        (score, move) = self.search_moves(boardSt, color, root_moves, depth, alpha, beta, 0)
+        self.tt.store(self.key(boardSt, color), depth, self.bound(score, alpha, beta), score, move)
+        return score, move
+
+    def search_moves(self, boardSt: BoardState, color: PlayerColor, moves, depth, alpha, beta, ply):
+        '''Search the moves of a node in order, until one causes a beta cutoff. Returns (best score, best move)'''
+        best_score = -INFINITY
+        best_move = None
+        for (index, move) in enumerate(moves):
+            score = self.search_move(boardSt, move, color, depth, alpha, beta, ply, index)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.new_best(ply, move)
+                    if alpha >= beta:
+                        self.orderer.record_cutoff(boardSt.board, move, color, ply, depth)
+                        break
+        return best_score, best_move
+
+    def search_move(self, boardSt: BoardState, move, color: PlayerColor, depth, alpha, beta, ply, index):
+        '''
+        Score one move of a node from the mover's point of view, where index is the move's place in the node's order.
+        With late-move reductions on, a quiet move ordered late is first searched less deeply, with a null window that
+        only checks that it is no better than alpha. If that check fails, the move is verified with a full search.
+        '''
+        if self.lmr and depth >= LMR_MIN_DEPTH and index >= LMR_MIN_INDEX and ply > 0 \
+                and self.is_quiet(boardSt, move, color, ply):
+            reduction = 1 if index < LMR_DEEP_INDEX else 2
+            score = -self.child_score(boardSt, move, color, depth - reduction, -alpha - 1, -alpha, ply + 1)
+            if score <= alpha:
+                return score
+            self.reductions_failed += 1
+        return self.search_full(boardSt, move, color, depth, alpha, beta, ply, index)
+
+    def search_full(self, boardSt: BoardState, move, color: PlayerColor, depth, alpha, beta, ply, index):
+        '''Score one move of a node from the mover's point of view, searched to the full depth'''
+        return -self.child_score(boardSt, move, color, depth, -beta, -alpha, ply + 1)
+
+    def is_quiet(self, boardSt: BoardState, move, color: PlayerColor, ply):
+        '''Check if a move is quiet: not a capture, and not one of the killer moves of the ply'''
+        return captured_power(boardSt.board, move, color) == 0 and move not in self.orderer.killers[ply]
+
+    def new_best(self, ply, move):
+        '''Called when a move raises alpha at a node. Subclasses can use it to collect the principal variation'''
+
+    @staticmethod
+    def bound(score, alpha, beta):
+        '''Get the kind of bound a score is, for a node searched with the (alpha, beta) window'''
+        if score <= alpha:
+            return UPPER_BOUND
+        if score >= beta:
+            return LOWER_BOUND
+        return EXACT
+
+    def child_score(self, boardSt: BoardState, move, color: PlayerColor, depth, alpha, beta, ply):
+        '''Play a move, and score the resulting position from the opponent's point of view'''
+        boardSt.make_move(move, color)
+        if is_game_over(boardSt):
+            score = terminal_score(boardSt, color.opponent, ply)
+        else:
+            score = self.negamax(boardSt, color.opponent, depth - 1, alpha, beta, ply)
+        boardSt.unmake_move()
+        return score
+
+    def negamax(self, boardSt: BoardState, color: PlayerColor, depth, alpha, beta, ply):
+        '''Score the position with the given colour to move, searched to the given depth'''
+        if depth <= 0:
+            return self.quiesce(boardSt, color, alpha, beta, ply, 0)
+        self.count_node()
+
+        key = self.key(boardSt, color)
+        entry = self.tt.probe(key)
+        hash_move = None
+        if entry is not None:
+            (_, entry_depth, bound, entry_score, hash_move) = entry
+            # A bound only ends the search of the node if it already causes a cutoff. The window is not narrowed by
+            # it: the scores are fail-soft, so a score found inside a narrowed window could fall outside it, and would
+            # then be stored as exact for the original window
+            if entry_depth >= depth and (bound == EXACT
+                                         or bound == LOWER_BOUND and entry_score >= beta
+                                         or bound == UPPER_BOUND and entry_score <= alpha):
+                return entry_score
+
+        moves = self.legal_moves(boardSt, color)
+        futility_bound = None
+        if self.futility and depth == 1 and boardSt.depth + 1 < MAX_TURNS:
+            # Futility pruning. A quiet move adds at most FUTILITY_MARGIN to the score (a spawn adds one power, and a
+            # spread that captures nothing only moves power around), and the opponent can then stand pat in the
+            # quiescence search. So at a frontier node where even that cannot reach alpha, only captures are searched
+            futility_bound = evaluate(boardSt, color) + FUTILITY_MARGIN
+            if futility_bound <= alpha:
+                moves = [move for move in moves if captured_power(boardSt.board, move, color) > 0]
+                self.futility_prunes += 1
+            else:
+                futility_bound = None
+
+        moves = self.orderer.order(boardSt.board, moves, color, ply, hash_move)
+        (best_score, best_move) = self.search_moves(boardSt, color, moves, depth, alpha, beta, ply)
+        if futility_bound is not None and futility_bound > best_score:
+            # The pruned moves score no more than the bound, and nothing searched beat it
+            return futility_bound
+
+        if best_move is None:
+            # No legal moves (this can only happen on a full board with no tiles of our own)
+            return evaluate(boardSt, color)
+
+        self.tt.store(key, depth, self.bound(best_score, alpha, beta), best_score, best_move)
+        return best_score
+
+    def quiesce(self, boardSt: BoardState, color: PlayerColor, alpha, beta, ply, qdepth):
+        '''
+        Score a position at the end of the main search by searching only captures (spreads onto the opponent's stacks),
+        so that positions in the middle of an exchange are not scored as they stand. The colour to move can always
+        decline to capture, so the present score (the stand pat) is a lower bound. A capture of power c changes the
+        score by at most 2c (c taken from the opponent and added to the mover), so captures that cannot raise the
+        score above alpha are pruned, unless they would end the game. qdepth counts the captures searched so far.
+        '''
+        self.count_node()
+        stand_pat = evaluate(boardSt, color)
+        if stand_pat >= beta or qdepth >= MAX_QUIESCENCE_DEPTH:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        board = boardSt.board
+        opp_power = boardSt.get_color_power(color.opponent)
+        # Near MAX_TURNS any capture can end the game, so its score is not bounded by its gain
+        ending = boardSt.depth + 1 >= MAX_TURNS
+        captures = []
+        for move in boardSt.get_encoded_spreadmoves(color):
+            captured = captured_power(board, move, color)
+            if captured > 0:
+                captures.append((captured, move))
+        captures.sort(reverse=True)
+
+        best_score = stand_pat
+        for (captured, move) in captures:
+            if stand_pat + 2 * captured <= alpha and captured < opp_power and not ending:
+                # Delta pruning. Captures are sorted by size, so no later one can raise alpha either (apart from one
+                # that takes every opponent stack, which is always the largest). The pruned captures could still score
+                # up to stand_pat + 2 * captured, so the score returned must be at least that to remain an upper bound
+                best_score = max(best_score, stand_pat + 2 * captured)
+                break
+            boardSt.make_move(move, color)
+            if is_game_over(boardSt):
+                score = -terminal_score(boardSt, color.opponent, ply + 1)
+            else:
+                score = -self.quiesce(boardSt, color.opponent, -beta, -alpha, ply + 1, qdepth + 1)
+            boardSt.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def count_node(self):
+        '''Count a node of the search, checking the clock every CHECK_INTERVAL nodes. Setting stopped (from another
+        thread) abandons the search at the next node'''
+        self.nodes += 1
+        if self.stopped:
+            raise SearchTimeout()
+        if self.nodes % CHECK_INTERVAL == 0 and self.hard_deadline is not None \
+                and time.process_time() >= self.hard_deadline:
+            raise SearchTimeout()
+
+    @staticmethod
+    def key(boardSt: BoardState, color: PlayerColor):
+        '''The transposition table key of a position: the board's hash with the colour to move folded in'''
+        return boardSt.hash ^ ZOBRIST_TO_MOVE[color.value]
+
+    @staticmethod
+    def legal_moves(boardSt: BoardState, color: PlayerColor):
+        '''Get every legal encoded move for the given colour. Spawns are only legal below the total power limit'''
+        moves = boardSt.get_encoded_spreadmoves(color)
+        if boardSt.get_total_power() < MAX_TOTAL_POWER:
+            moves += boardSt.get_encoded_spawnmoves()
+        return moves
+
+    def order_root_moves(self, boardSt: BoardState, color: PlayerColor):
+        '''Get the legal root moves, best immediate outcome first (scored from the cells each touches, without playing
+        it)'''
+        scores = {}
+        for move in self.legal_moves(boardSt, color):
+            (mine, theirs, wins) = boardSt.move_delta(move, color)
+            scores[move] = mine - theirs + (INFINITY if wins else 0)
+        return sorted(scores, key=lambda move: -scores[move])
+
+
+class PVSearcher(Searcher):
+    '''
+    Principal variation search. The first move of each node is searched with the full window, and the rest with a null
+    window that only proves they are no better; a move that proves better is searched again with the full window. Each
+    iteration of deepening starts with an aspiration window around the last iteration's score, widened on a fail.
+    The principal variation is collected in a triangular table: pv[ply] holds the best line from ply onwards.
+    '''
+    # The first aspiration window is the last score plus or minus this much. It doubles on each fail, and once it
+    # reaches MAX_ASPIRATION the failing side is opened up completely
+    ASPIRATION_WINDOW = 2
+    MAX_ASPIRATION = 16
+
+    def __init__(self, tt: TranspositionTable, **options):
+        super().__init__(tt, **options)
+        self.pv = [[None] * MAX_PLY for _ in range(MAX_PLY)]
+        self.pv_length = [0] * MAX_PLY
+        self.best_pv = []
+        self.researches = 0
+
+    def search(self, boardSt: BoardState, color: PlayerColor, soft_deadline=None, hard_deadline=None,
+               max_depth=MAX_DEPTH, start_depth=1):
+        self.best_pv = []
+        self.researches = 0
+        return super().search(boardSt, color, soft_deadline, hard_deadline, min(max_depth, MAX_PLY - 1), start_depth)
+
+    def iterate(self, boardSt: BoardState, color: PlayerColor, depth, root_moves, prev_score):
+        if prev_score is None or abs(prev_score) >= WIN_SCORE - MAX_DEPTH:
+            (alpha, beta) = (-INFINITY, INFINITY)
+        else:
+            (alpha, beta) = (prev_score - self.ASPIRATION_WINDOW, prev_score + self.ASPIRATION_WINDOW)
+
+        window = self.ASPIRATION_WINDOW
+        while True:
+            self.pv_length[0] = 0
+            (score, move) = self.search_root(boardSt, color, depth, root_moves, alpha, beta)
+            if alpha < score < beta:
+                break
+            # The score is outside the window, so it is only a bound. Widen the side it failed on and search again
+            self.researches += 1
+            window *= 2
+            if score <= alpha:
+                alpha = -INFINITY if window >= self.MAX_ASPIRATION else prev_score - window
+            else:
+                beta = INFINITY if window >= self.MAX_ASPIRATION else prev_score + window
+
+        self.best_pv = self.pv[0][:self.pv_length[0]]
+        return score, move
+
+    def search_full(self, boardSt: BoardState, move, color: PlayerColor, depth, alpha, beta, ply, index):
+        if index == 0:
+            return -self.child_score(boardSt, move, color, depth, -beta, -alpha, ply + 1)
+        # Scores are whole numbers, so (alpha, alpha + 1) is a null window
+        score = -self.child_score(boardSt, move, color, depth, -alpha - 1, -alpha, ply + 1)
+        if alpha < score < beta:
+            self.researches += 1
+            score = -self.child_score(boardSt, move, color, depth, -beta, -alpha, ply + 1)
+        return score
+
+    def child_score(self, boardSt: BoardState, move, color: PlayerColor, depth, alpha, beta, ply):
+        # The child's line is empty until one of its moves raises alpha (and stays empty at leaves)
+        self.pv_length[ply] = ply
+        return super().child_score(boardSt, move, color, depth, alpha, beta, ply)
+
+    def new_best(self, ply, move):
+        # This node's line is the move followed by the child's line
+        row = self.pv[ply]
+        row[ply] = move
+        length = self.pv_length[ply + 1]
+        row[ply + 1:length] = self.pv[ply + 1][ply + 1:length]
+        self.pv_length[ply] = max(length, ply + 1)
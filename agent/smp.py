@@ -0,0 +1,119 @@
+# Lazy SMP: a parallel search in which several processes search the same root and share what they find through a
+# transposition table in shared memory (see SharedTranspositionTable). The helpers deepen from staggered depths, so
+# they tend to be working a ply ahead of the main search and leave deeper entries and hash moves in the table for it.
+#
+# The referee only times and measures the agent's own process: its CountdownTimer reads time.process_time() (which
+# does not include child processes) and its MemoryWatcher reads /proc/self/status. The shared table is mapped into
+# the agent's process, so it counts towards the space limit, and is sized to fit it. The helpers' CPU time does not
+# count, but they run alongside the main search, so they only help when there are spare cores.
+import atexit
+import multiprocessing
+import sys
+import time
+
+from referee.game import PlayerColor
+
+from .agentboard import BoardState
+from .search import Searcher, MAX_DEPTH
+from .transposition import SharedTranspositionTable
+
+
+def start_helper(target, *args):
+    '''
+    Fork a daemon process running target(conn, *args), where conn is its end of a pipe. Returns (process, conn), where
+    conn is this process's end. Forking (rather than spawning a fresh interpreter) means the arguments are inherited
+    rather than pickled, and the helper shares anything mapped into memory before it started, such as a shared table.
+    '''
+    context = multiprocessing.get_context("fork")
+    (conn, child_conn) = context.Pipe()
+    process = context.Process(target=target, args=(child_conn, *args), daemon=True)
+    # A new process closes its sys.stdin, but the referee replaces sys.stdin with an object that can't be closed
+    # (see referee/agent/subprocess.py), so the helper is started without one
+    stdin = sys.stdin
+    sys.stdin = None
+    try:
+        process.start()
+    finally:
+        sys.stdin = stdin
+    return (process, conn)
+
+
+def stop_helpers(helpers):
+    '''Ask each (process, conn) helper to end, by sending None, and wait for it'''
+    for (process, conn) in helpers:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        process.join(timeout=1)
+
+
+def _helper(conn, searcher: Searcher, index):
+    '''
+    The body of a helper process. It waits for (board, turn, colour, soft budget, hard budget, max depth) requests, searches each
+    one until its own CPU time budgets run out, and replies with (result, nodes). None ends the process.
+    '''
+    # Odd helpers start a ply ahead of the main search, even ones level with it
+    start_depth = 1 + index % 2
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        (board, turn, color, soft_budget, hard_budget, max_depth) = request
+        boardSt = BoardState(board, [], turn, color)
+        # A budget of None (a search with no deadline) is passed on as no deadline
+        now = time.process_time()
+        soft_deadline = None if soft_budget is None else now + soft_budget
+        hard_deadline = None if hard_budget is None else now + hard_budget
+        result = searcher.search(boardSt, color, soft_deadline=soft_deadline, hard_deadline=hard_deadline,
+                                 max_depth=max_depth, start_depth=start_depth)
+        conn.send((result, searcher.nodes))
+
+
+class LazySMP:
+    '''
+    A main searcher, run in this process, and a pool of helper processes that share its transposition table. The
+    helpers are forked when the pool is created, and stopped when the agent's process exits.
+    '''
+
+    def __init__(self, workers, tt: SharedTranspositionTable, searcher_class=Searcher):
+        self.tt = tt
+        self.searcher = searcher_class(tt)
+        self.helpers = []
+        self.nodes = 0
+        self.helper_nodes = 0
+
+        for index in range(1, workers):
+            self.helpers.append(start_helper(_helper, searcher_class(tt), index))
+        atexit.register(self.close)
+
+    def search(self, boardSt: BoardState, color: PlayerColor, soft_deadline=None, hard_deadline=None,
+               max_depth=MAX_DEPTH):
+        '''
+        Search the position with every process, until the deadlines (time.process_time() values in this process, or
+        None for no limit) or max_depth.
+        Returns the (move, score, depth) of whichever process finished the deepest iteration, preferring the main one.
+        '''
+        now = time.process_time()
+        soft_budget = None if soft_deadline is None else soft_deadline - now
+        hard_budget = None if hard_deadline is None else hard_deadline - now
+        for (_, conn) in self.helpers:
+            conn.send((boardSt.board.copy(), boardSt.depth, color, soft_budget, hard_budget, max_depth))
+
+        best = self.searcher.search(boardSt, color, soft_deadline, hard_deadline, max_depth)
+        self.nodes = self.searcher.nodes
+        self.helper_nodes = 0
+        for (_, conn) in self.helpers:
+            (result, nodes) = conn.recv()
+            self.helper_nodes += nodes
+            if result[0] is not None and result[2] > best[2]:
+                best = result
+        return best
+
+    def close(self):
+        '''Stop the helpers and free the shared table'''
+        stop_helpers(self.helpers)
+        self.helpers = []
+        if self.tt.shm is not None:
+            self.tt.close()
+            self.tt.shm = None
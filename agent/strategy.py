@@ -3,8 +3,21 @@ from referee.game import \
     PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
 
 from .agentboard import BoardState
+from .bitboard import BitBoardState
+from .config import DEBUG, PONDER, WORKERS
+from .mcts import MCTS
+from .moves import decode_move, encode_action, is_spawn
+from .ponder import Ponderer
+from .rootsplit import RootSplitPool
+from .search import Searcher, PVSearcher
+from .smp import LazySMP
+from .timing import TimeManager
+from .transposition import TranspositionTable, SharedTranspositionTable
 
 import random
+import sys
+import time
+from collections import OrderedDict
 
 class ParentStrategy:
     """
@@ -15,6 +28,9 @@ class ParentStrategy:
         Initialise the strategy.
         """
         self._color = color
+
+        # The clock for each move. Strategies start it at the beginning of action(), and poll its deadlines
+        self.timer = TimeManager()
         
     def action(self, board: BoardState, **referee: dict) -> Action:
         """
@@ -22,6 +38,13 @@ class ParentStrategy:
         """
         pass
 
+    def turn(self, boardSt: BoardState, color: PlayerColor, action: Action, **referee: dict):
+        """
+        Called after each action (by either player) has been played on boardSt. Strategies that keep search state
+        between turns move it on to the new position here.
+        """
+        pass
+
 class RandomStrategy(ParentStrategy):
     """
     A strategy that makes a random move.
@@ -74,23 +97,65 @@ class OneMoveStrategy2(ParentStrategy):
     """
     A strategy that makes a move with no look-ahead. Makes the move with the best immediate outcome.
     Different from OneMoveStrategy in that it will prioritise decreasing opponent power, not just increasing net gain.
+    The move chosen depends only on the board and the colour, so the moves chosen are remembered for the last
+    MEMO_SIZE positions (least recently used first out), for when the same position comes up again, as it does many
+    times over inside TwoMoveStrategy.
     """
-    def action(self, boardSt: BoardState, **referee: dict) -> Action:
+    # The most positions remembered
+    MEMO_SIZE = 1 << 14
+
+    def __init__(self, color: PlayerColor, **referee: dict):
         """
-        Return the next action to take.
+        Initialise the strategy, with an empty memo.
         """
-        
+        super().__init__(color, **referee)
+        self.memo = OrderedDict()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def action(self, boardSt: BoardState, **referee: dict) -> int:
+        """
+        Return the next action to take, as an encoded move (see moves.py).
+        """
+        key = (boardSt.hash, self._color)
+        move = self.memo.get(key)
+        if move is not None:
+            self.memo_hits += 1
+            self.memo.move_to_end(key)
+            return move
 
+        self.memo_misses += 1
+        move = self.best_move(boardSt)
+        if move is not None:
+            self.memo[key] = move
+            if len(self.memo) > self.MEMO_SIZE:
+                self.memo.popitem(last=False)
+        return move
+
+    def memo_hit_rate(self):
+        """
+        Get the fraction of calls to action() answered from the memo.
+        """
+        calls = self.memo_hits + self.memo_misses
+        return self.memo_hits / calls if calls else 0.0
+
+    def best_move(self, boardSt: BoardState) -> int:
+        """
+        Find the move with the best immediate outcome, as an encoded move.
+        """
         # OneMoveStrategy prioritises spread moves, choosing the spreadmove with the highest net gain.
         best_move = None
         best_gain = 0
         
-        for spread in boardSt.get_spreadmoves(self._color):
+        # Score every spread move from the cells it touches (see BoardState.move_delta), rather than building each
+        # child board
+        for spread in boardSt.get_encoded_spreadmoves(self._color):
+            (_, opp_change, wins) = boardSt.move_delta(spread, self._color)
             # Firstly, check if spread move results in winning the game.
-            if (boardSt.check_if_win(self._color, boardSt.get_new_boardstate(spread, self._color))):
+            if (wins):
                 return spread
             # Otherwise, calculate the move that results in the biggest decrease in net opponent power.
-            spread_gain = - (boardSt.calculate_move_opp_impact(spread, self._color))
+            spread_gain = - opp_change
             if spread_gain > best_gain:
                 best_move = spread
                 best_gain = spread_gain
@@ -100,10 +165,10 @@ class OneMoveStrategy2(ParentStrategy):
 
         # If the best spread move has net gain =< 1, and total board power < 48, it will spawn a cell next to an opponent cell with the highest power.
         best_opp_adjacent = 0
-        if boardSt.get_total_power(boardSt.board) < 48 and best_gain < 1:
+        if boardSt.get_total_power() < 48 and best_gain < 1:
 
-            for spawn in boardSt.get_spawnmoves():
-                opp_adjacent = boardSt.get_highest_opp_tile_adjacent(boardSt.board, self._color, spawn.cell)
+            for spawn in boardSt.get_encoded_spawnmoves():
+                opp_adjacent = boardSt.highest_opp_power_adjacent(spawn, self._color)
                 if opp_adjacent > best_opp_adjacent:
                     best_move = spawn
                     best_gain = 1
@@ -117,102 +182,177 @@ class TwoMoveStrategy(ParentStrategy):
     """
     Strategy that makes a move with one look-ahead. Makes the move with the best outcome after the next move.
     Predicts opponent's move using OneMoveStrategy.
+    With AGENT_WORKERS above 1, the candidate moves are shared out between that many processes (see rootsplit.py).
     """
-    def action(self, boardSt: BoardState, **referee: dict) -> Action:
+    # The scores evaluate_moves gives a move that wins the game outright, and one after which the opponent's
+    # predicted reply wins it
+    WINNING_MOVE = float("inf")
+    LOSING_MOVE = float("-inf")
+
+    def __init__(self, color: PlayerColor, **referee: dict):
         """
-        Return the next action to take.
+        Initialise the strategy, and the pool of helper processes if there is one.
         """
-        # TwoMoveStrategy prioritises spread moves, choosing the spreadmove with the highest net gain.
-        best_move = None
-        best_gain = 0
-        running_gain = 0
-        best_opp_move = None
+        super().__init__(color, **referee)
 
-        # Create a new OneMoveStrategy object to predict opponent's move.
-        opp_strategy = OneMoveStrategy2(self._color.opponent, **referee)
+        # A OneMoveStrategy2 object to predict opponent's move, and one to find the best move after it.
+        self.opp_strategy = OneMoveStrategy2(color.opponent, **referee)
+        self.next_turn_strategy = OneMoveStrategy2(color, **referee)
 
-        # Create a new OneMoveStrategy object to find the best move after the opponent's predicted move.
-        next_turn_strategy = OneMoveStrategy2(self._color, **referee)
+        self.pool = RootSplitPool(WORKERS, self) if WORKERS > 1 else None
 
-        # Iterate through all possible moves. Find the move with the highest net gain after the opponent's move.
-        for spread in boardSt.get_spreadmoves(self._color):
-            # Create a copy of the boardstate and calculate the net gain of the spread move.
+    def action(self, boardSt: BoardState, **referee: dict) -> int:
+        """
+        Return the next action to take, as an encoded move (see moves.py).
+        """
+        self.timer.start(boardSt, **referee)
+        # Under a time limit, stop looking once the hard deadline has passed and play the best move found so far.
+        deadline = self.timer.hard_deadline if self.timer.limited else None
 
-            copyBoard = boardSt.copy()
-            running_gain = copyBoard.calculate_move_impact(spread, self._color)
-            copyBoard.board = copyBoard.get_new_boardstate(spread, self._color)
+        # TwoMoveStrategy prioritises spread moves, so they are scored first.
+        # If the total board power < 48, spawn moves are candidates as well.
+        moves = boardSt.get_encoded_spreadmoves(self._color)
+        if boardSt.get_total_power(boardSt.board) < 48:
+            moves += boardSt.get_encoded_spawnmoves()
+
+        if self.pool is not None:
+            scores = self.pool.evaluate_moves(boardSt, moves, deadline)
+        else:
+            scores = self.evaluate_moves(boardSt, moves, deadline)
+        if DEBUG:
+            # With a pool, these count this process's share of the work only
+            print(f"TwoMove {self._color} turn {boardSt.depth}: {len(moves)} candidates, reply memo "
+                  f"{self.opp_strategy.memo_hit_rate():.1%} hits ({len(self.opp_strategy.memo)} positions), follow-up "
+                  f"memo {self.next_turn_strategy.memo_hit_rate():.1%} hits ({len(self.next_turn_strategy.memo)} "
+                  f"positions), {self.timer.elapsed():.3f}s", file=sys.stderr)
+        return self.choose_move(moves, scores)
+
+    def evaluate_moves(self, boardSt: BoardState, moves, deadline=None):
+        """
+        Score each move by the net gain after it, the opponent's predicted reply and our best move after that.
+        Each line is played out with make_move, and reverted with unmake_move afterwards, on a BitBoardState copy of
+        boardSt (see bitboard.py), where both are cheaper.
+        Stops early after a winning move, or when the deadline (a time.process_time() value) has passed and at least
+        one move has been scored, so the list returned may be shorter than moves.
+        """
+        boardSt = BitBoardState.from_boardstate(boardSt)
+        scores = []
+        scored = False
+        for move in moves:
+            if deadline is not None and scored and time.process_time() >= deadline:
+                break
+            score = self.evaluate_move(boardSt, move)
+            scores.append(score)
+            if score == self.WINNING_MOVE:
+                break
+            scored = scored or score != self.LOSING_MOVE
+        return scores
 
+    def evaluate_move(self, boardSt: BoardState, move):
+        """
+        Score one move by the net gain after it, the opponent's predicted reply and our best move after that.
+        """
+        if is_spawn(move):
+            # A spawn always has a net gain of 1.
+            running_gain = 1
+            boardSt.make_move(move, self._color)
+        else:
             # Check if spread move results in winning the game.
-            if (copyBoard.check_if_win(self._color, copyBoard.board)):
-                return spread
-            
-            # Predict opponent's move and calculate the net gain of the opponent's move.
-            opp_move = opp_strategy.action(copyBoard, **referee)
-            running_gain += copyBoard.calculate_move_impact(opp_move, self._color.opponent)
-            copyBoard.board = copyBoard.get_new_boardstate(opp_move, self._color.opponent)
+            # Both this and the net gain are worked out from the cells the spread touches, before it is played.
+            if (boardSt.check_if_move_wins(move, self._color)):
+                return self.WINNING_MOVE
+
+            # Calculate the net gain of the spread move, then play it.
+            running_gain = boardSt.calculate_move_impact(move, self._color)
+            boardSt.make_move(move, self._color)
+
+        # Predict opponent's move and calculate the net gain of the opponent's move.
+        opp_move = self.opp_strategy.action(boardSt)
+
+        # Ensure that we aren't trying to play from a game that has already been lost.
+        if (boardSt.check_if_move_wins(opp_move, self._color.opponent)):
+            boardSt.unmake_move()
+            return self.LOSING_MOVE
+
+        running_gain += boardSt.calculate_move_impact(opp_move, self._color.opponent)
+        boardSt.make_move(opp_move, self._color.opponent)
+
+        # Then, find the spread move with the highest gain after the opponent's move.
+        next_move = self.next_turn_strategy.action(boardSt)
+        running_gain += boardSt.calculate_move_impact(next_move, self._color)
+        boardSt.unmake_move()
+        boardSt.unmake_move()
+        return running_gain
+
+    def choose_move(self, moves, scores):
+        """
+        Pick the move with the highest score, going through the moves in order, so the first of equally good moves
+        wins. Scores are None for moves that were never scored (the deadline passed first), and the search stops at
+        the first of them.
+        """
+        best_move = None
+        best_gain = 0
+        last_resort = None
+
+        for (move, score) in zip(moves, scores):
+            if score is None:
+                break
+            # A winning move is played at once.
+            if score == self.WINNING_MOVE:
+                return move
 
-            # Ensure that we aren't trying to play from a game that has already been lost.
             # However, if the only possible move is a losing move, we will play it.
-            # This 'last resort' case in is in the specific instance that a spawn move is not possible, 
+            # This 'last resort' case in is in the specific instance that a spawn move is not possible,
             # and the only spread move possible is a losing move.
-            if (copyBoard.check_if_win(self._color.opponent, copyBoard.board)):
-                last_resort = spread
+            if score == self.LOSING_MOVE:
+                if not is_spawn(move):
+                    last_resort = move
                 continue
 
-            # Then, find the spread move with the highest gain after the opponent's move.
-            next_move = next_turn_strategy.action(copyBoard, **referee)
-            running_gain += copyBoard.calculate_move_impact(next_move, self._color)
-            copyBoard.board = copyBoard.get_new_boardstate(next_move, self._color)
-
-            if running_gain > best_gain:
-                best_move = spread
-                best_gain = running_gain
-                best_opp_move = opp_move
+            if score > best_gain:
+                best_move = move
+                best_gain = score
             elif best_move is None:
-                best_move = spread
-                best_gain = running_gain
-                best_opp_move = opp_move
-
-
-        # If the  total board power < 48, iterate through possible spawn moves to see if there is a spawn move that will result in the highest net gain after the opponent's move.
-        if boardSt.get_total_power(boardSt.board) < 48:
-            for spawn in boardSt.get_spawnmoves():
-                # Create a copy of the boardstate and calculate the net gain of the spawn move.
-                copyBoard = boardSt.copy()
-                copyBoard.board = copyBoard.get_new_boardstate(spawn, self._color)
-                running_gain = 1
-
-                # Predict opponent's move and calculate the net gain of the opponent's move.
-                opp_move = opp_strategy.action(copyBoard, **referee)
-                running_gain += copyBoard.calculate_move_impact(opp_move, self._color.opponent)
-                copyBoard.board = copyBoard.get_new_boardstate(opp_move, self._color.opponent)
-
-                # delete this
-                opp_copyBoard = copyBoard.board
-                
-                # Ensure that we aren't trying to play from a game that has already been lost.
-                if (copyBoard.check_if_win(self._color.opponent, copyBoard.board)):
-                    continue
-
-                # Then, find the spread move with the highest gain after the opponent's move.
-                next_move = next_turn_strategy.action(copyBoard, **referee)
-                running_gain += copyBoard.calculate_move_impact(next_move, self._color)
-                copyBoard.board = copyBoard.get_new_boardstate(next_move, self._color)
-                
-                if running_gain > best_gain:
-                    best_move = spawn
-                    best_gain = running_gain
-                    best_opp_move = opp_move
-                elif best_move is None:
-                    best_move = spawn
-                    best_gain = running_gain
-                    best_opp_move = opp_move
+                best_move = move
+                best_gain = score
 
         if best_move is None:
             return last_resort
-        
+
         return best_move
-    
+
+class MCTSStrategy(ParentStrategy):
+    """
+    Strategy that plays the move found by Monte-Carlo tree search (see mcts.py), running playouts until the soft
+    deadline of the move's time budget. With AGENT_DEBUG set, the iterations per second are printed to stderr.
+    """
+    def __init__(self, color: PlayerColor, **referee: dict):
+        """
+        Initialise the strategy.
+        """
+        super().__init__(color, **referee)
+        self.mcts = MCTS()
+
+    def action(self, boardSt: BoardState, **referee: dict) -> int:
+        """
+        Return the next action to take, as an encoded move (see moves.py).
+        """
+        self.timer.start(boardSt, **referee)
+        reused = self.mcts.visits[0] if self.mcts.matches(boardSt, self._color) else 0
+        move = self.mcts.search(boardSt, self._color, deadline=self.timer.soft_deadline)
+        if DEBUG:
+            elapsed = self.timer.elapsed()
+            print(f"MCTS {self._color} turn {boardSt.depth + 1}: {self.mcts.iterations} iterations in {elapsed:.3f}s "
+                  f"({self.mcts.iterations / max(elapsed, 1e-9):.0f}/s), {len(self.mcts.move)} nodes, "
+                  f"{reused} playouts reused", file=sys.stderr)
+        return move
+
+    def turn(self, boardSt: BoardState, color: PlayerColor, action: Action, **referee: dict):
+        """
+        Keep the subtree below the move that was played, so the next search starts from the playouts already run.
+        """
+        self.mcts.advance(encode_action(action), boardSt, color.opponent)
+
 class RandomStrategy(ParentStrategy):
     """
     A random strategy that makes a move with no look-ahead. 
@@ -240,11 +380,85 @@ class RandomStrategy(ParentStrategy):
             
 class AlphaBetaStrategy(ParentStrategy):
     """
-    A strategy that uses alpha-beta pruning to look ahead 2 turns. 
+    A strategy that searches the game tree with negamax alpha-beta, deepening one ply at a time until its share of the
+    referee's time budget is used up. The transposition table is kept for the whole game.
+    With AGENT_PONDER set, the strategy also searches on the opponent's time (see ponder.py), and with AGENT_WORKERS
+    above 1, it searches with that many processes (see smp.py).
     """
-    def action(self, boardSt: BoardState, **referee: dict) -> Action:
+    # The class of searcher used
+    SEARCHER = Searcher
+
+    def __init__(self, color: PlayerColor, **referee: dict):
         """
-        Return the next action to take.
+        Initialise the strategy, with a transposition table sized to the referee's space limit.
+        """
+        super().__init__(color, **referee)
+        if WORKERS > 1:
+            self.smp = LazySMP(WORKERS, SharedTranspositionTable.from_referee(**referee), self.SEARCHER)
+            self.searcher = self.smp.searcher
+        else:
+            self.smp = None
+            self.searcher = self.SEARCHER(TranspositionTable.from_referee(**referee))
+
+        # The pondering thread gets its own searcher, sharing the transposition table. It is left out if its memory
+        # does not fit in the referee's space limit
+        self.ponderer = Ponderer.from_referee(self.SEARCHER(self.searcher.tt), **referee) if PONDER else None
+        if DEBUG and PONDER and self.ponderer is None:
+            print(f"Ponder {self._color}: not pondering, the thread does not fit in the space limit", file=sys.stderr)
+
+    def action(self, boardSt: BoardState, **referee: dict) -> int:
+        """
+        Return the next action to take, as an encoded move (see moves.py).
         """
+        self.timer.start(boardSt, **referee)
+        (move, _, _) = self.search(boardSt)
+        return move
 
-        
\ No newline at end of file
+    def search(self, boardSt: BoardState):
+        """
+        Search for our move until the timer's deadlines, with the parallel search if there is one. Returns
+        (move, score, depth).
+        """
+        searcher = self.smp if self.smp is not None else self.searcher
+        return searcher.search(boardSt, self._color, soft_deadline=self.timer.soft_deadline,
+                               hard_deadline=self.timer.hard_deadline)
+
+    def turn(self, boardSt: BoardState, color: PlayerColor, action: Action, **referee: dict):
+        """
+        When pondering, start after our own move, and stop when the opponent's move comes in.
+        """
+        if self.ponderer is None:
+            return
+        if color == self._color:
+            self.ponderer.start(boardSt, color.opponent)
+            return
+
+        hit = self.ponderer.stop(encode_action(action))
+        if DEBUG and hit is not None:
+            ponderer = self.ponderer
+            result = ponderer.result
+            print(f"Ponder {self._color} turn {boardSt.depth}: {'hit' if hit else 'miss'}, "
+                  f"predicted {decode_move(ponderer.predicted)}, reached depth {result[2] if result else 0}; "
+                  f"{ponderer.hits}/{ponderer.ponders} hits, {ponderer.nodes} nodes in {ponderer.cpu_time:.3f}s of "
+                  f"thread CPU, {ponderer.stop_time:.4f}s spent stopping", file=sys.stderr)
+
+class PVSStrategy(AlphaBetaStrategy):
+    """
+    A strategy that searches with principal variation search and aspiration windows (see PVSearcher). With AGENT_DEBUG
+    set, the depth reached and the principal variation of every move are printed to stderr.
+    """
+    SEARCHER = PVSearcher
+
+    def action(self, boardSt: BoardState, **referee: dict) -> int:
+        """
+        Return the next action to take, as an encoded move (see moves.py).
+        """
+        self.timer.start(boardSt, **referee)
+        (move, score, depth) = self.search(boardSt)
+        if DEBUG:
+            pv = " ".join(str(decode_move(m)) for m in self.searcher.best_pv)
+            helpers = f", helpers {self.smp.helper_nodes} nodes" if self.smp is not None else ""
+            print(f"PVS {self._color} turn {boardSt.depth + 1}: depth {depth}, score {score}, "
+                  f"{self.searcher.nodes} nodes ({self.searcher.researches} re-searches){helpers} in "
+                  f"{self.timer.elapsed():.3f}s of {self.timer.budget:.3f}s, pv: {pv}", file=sys.stderr)
+        return move
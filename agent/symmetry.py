@@ -0,0 +1,117 @@
+# Canonicalisation of positions under the symmetries of the board.
+# Positions wrap around modulo 7 in both axes, so translating every tile by the same (dr, dq) gives a position that
+# plays identically. Swapping the colour of every tile (and of the player to move) also gives an identical position,
+# with the score negated. A cache keyed on the canonical key of a position could share entries across all of these.
+#
+# None of the agent's caches do. Translated copies of a position almost never meet within one search, and
+# canonicalising hashes the whole board for each of its highest power stacks, where the transposition table key is
+# updated incrementally. Keying the table on canonical keys for positions of up to 6 stacks saved under 2% of the nodes
+# of depth 5 opening searches, and made them about 30% slower.
+from referee.game import SpawnAction, SpreadAction, HexPos, PlayerColor
+
+from .moves import FIRST_SPREAD, MOVE_CELL, MOVE_DIR, spread_move
+from .tables import BOARD_N, CELLS, CELL_INDEX, ZOBRIST_KEYS, ZOBRIST_TO_MOVE
+
+# A transform is a pair (shift, swapped). shift is the index of the cell (dr, dq) that every tile is moved by, and
+# swapped is True if the colours are swapped
+IDENTITY = (0, False)
+
+# TRANSLATE[shift][cell] -> the index of the cell moved by the offset with index shift
+TRANSLATE = [
+    [CELL_INDEX[((r + dr) % BOARD_N, (q + dq) % BOARD_N)] for (r, q) in CELLS]
+    for (dr, dq) in CELLS
+]
+
+# NEGATE[shift] -> the index of the opposite offset, which undoes the translation
+NEGATE = [CELL_INDEX[((-dr) % BOARD_N, (-dq) % BOARD_N)] for (dr, dq) in CELLS]
+
+
+def transformed_hash(board: dict, color: PlayerColor, transform):
+    '''Get the Zobrist hash (including the colour to move) of a board after applying the given transform'''
+    (shift, swapped) = transform
+    translate = TRANSLATE[shift]
+    hash = ZOBRIST_TO_MOVE[color.value ^ swapped]
+    for ((r, q), (player, k)) in board.items():
+        hash ^= ZOBRIST_KEYS[translate[CELL_INDEX[(r, q)]]][player.value ^ swapped][k]
+    return hash
+
+
+def canonicalise(board: dict, color: PlayerColor):
+    '''
+    Map a board (with the given colour to move) to its canonical form. Returns (key, transform), where key is the hash
+    of the canonical position and transform maps this position onto it.
+
+    Only translations that move one of the highest power tiles onto cell (0, 0) are tried, in both colour orientations.
+    The highest power is the same in every equivalent position, so each of them tries the same set of candidates and
+    picks the same (lowest hash) one, without hashing all 98 transforms.
+    '''
+    if not board:
+        return (ZOBRIST_TO_MOVE[color.value], IDENTITY)
+
+    max_power = max(k for (_, k) in board.values())
+    best = None
+    for (cell, (_, k)) in board.items():
+        if k != max_power:
+            continue
+        shift = NEGATE[CELL_INDEX[cell]]
+        for swapped in (False, True):
+            key = transformed_hash(board, color, (shift, swapped))
+            if best is None or key < best[0]:
+                best = (key, (shift, swapped))
+    return best
+
+
+def canonical_key(board: dict, color: PlayerColor):
+    '''Get just the canonical hash of a board with the given colour to move'''
+    return canonicalise(board, color)[0]
+
+
+def inverse(transform):
+    '''Get the transform that undoes the given one'''
+    (shift, swapped) = transform
+    return (NEGATE[shift], swapped)
+
+
+def transform_board(board: dict, transform):
+    '''Apply a transform to a dictionary board, returning a new board'''
+    (shift, swapped) = transform
+    translate = TRANSLATE[shift]
+    return {
+        CELLS[translate[CELL_INDEX[cell]]]: (PlayerColor(player.value ^ swapped), k)
+        for (cell, (player, k)) in board.items()
+    }
+
+
+def transform_color(color: PlayerColor, transform):
+    '''Map a colour through a transform'''
+    return color.opponent if transform[1] else color
+
+
+def transform_score(score, transform):
+    '''Map a score from RED's point of view through a transform. Swapping the colours negates it'''
+    return -score if transform[1] else score
+
+
+def transform_move(move, transform):
+    '''
+    Map a move (a referee Action, or an encoded move as in moves.py) through a transform. Translations move the cell,
+    but leave the direction of a spread unchanged
+    '''
+    (shift, _) = transform
+    translate = TRANSLATE[shift]
+    if isinstance(move, int):
+        if move < FIRST_SPREAD:
+            return translate[move]
+        return spread_move(translate[MOVE_CELL[move]], MOVE_DIR[move])
+    cell = CELLS[translate[CELL_INDEX[(move.cell.r, move.cell.q)]]]
+    match move:
+        case SpawnAction():
+            return SpawnAction(HexPos(*cell))
+        case SpreadAction(_, direction):
+            return SpreadAction(HexPos(*cell), direction)
+    raise ValueError(f"Unknown move {move}")
+
+
+def untransform_move(move, transform):
+    '''Map a move in the canonical position back to the position the transform was computed for'''
+    return transform_move(move, inverse(transform))
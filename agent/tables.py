@@ -0,0 +1,92 @@
+# Lookup tables shared by the agent's board representations.
+# Everything here is computed once at import, so the innermost operations of a search (eg. applying a spread) become
+# table lookups rather than repeated coordinate arithmetic.
+import random
+
+from referee.game import HexDir
+
+BOARD_N = 7
+NUM_CELLS = BOARD_N * BOARD_N
+MAX_POWER = 6
+
+# All cells on the board, in index order. A cell (r, q) has index r * 7 + q
+CELLS = [(r, q) for r in range(BOARD_N) for q in range(BOARD_N)]
+CELL_INDEX = {cell: i for i, cell in enumerate(CELLS)}
+
+# The six hex directions, in HexDir order
+DIRECTIONS = list(HexDir)
+DIR_INDEX = {dir: i for i, dir in enumerate(DIRECTIONS)}
+
+
+def _build_spread_targets():
+    '''SPREAD_TARGETS[cell][dir][power - 1] -> tuple of the (r, q) cells a spread of that power lands on'''
+    targets = []
+    for (r, q) in CELLS:
+        by_dir = []
+        for dir in DIRECTIONS:
+            by_dir.append(tuple(
+                tuple(((r + dir.r * i) % BOARD_N, (q + dir.q * i) % BOARD_N) for i in range(1, k + 1))
+                for k in range(1, MAX_POWER + 1)
+            ))
+        targets.append(by_dir)
+    return targets
+
+
+SPREAD_TARGETS = _build_spread_targets()
+
+# The same table, but with cell indices rather than (r, q) coordinates
+SPREAD_TARGET_INDICES = [
+    [tuple(tuple(CELL_INDEX[cell] for cell in cells) for cells in by_power) for by_power in by_dir]
+    for by_dir in SPREAD_TARGETS
+]
+
+
+def _build_zobrist_keys(seed=30024):
+    '''ZOBRIST_KEYS[cell][colour][power] -> a random 64-bit key, plus a key for each colour to move.
+    A fixed seed keeps hashes stable between runs'''
+    rng = random.Random(seed)
+    keys = [
+        [[0] + [rng.getrandbits(64) for _ in range(MAX_POWER)] for _ in range(2)]
+        for _ in range(NUM_CELLS)
+    ]
+    to_move = [rng.getrandbits(64) for _ in range(2)]
+    return keys, to_move
+
+
+# A position's Zobrist hash is the xor of the keys of every (cell, colour, power) on the board. Search keys also xor in
+# the key of the colour to move, as the same board with a different player to move is a different position
+(ZOBRIST_KEYS, ZOBRIST_TO_MOVE) = _build_zobrist_keys()
+
+
+def _wrapped_distance(a, b):
+    '''The distance between two rows (or columns), going around the edge of the board if that is shorter'''
+    d = abs(a - b)
+    return min(d, BOARD_N - d)
+
+
+# ROW_DISTANCES[a][b] -> the wrapped distance between rows (or columns) a and b
+ROW_DISTANCES = [[_wrapped_distance(a, b) for b in range(BOARD_N)] for a in range(BOARD_N)]
+
+# R_Q_DISTANCES[i][j] -> the wrapped (dr, dq) distances between the cells with indices i and j
+R_Q_DISTANCES = [[(ROW_DISTANCES[r1][r2], ROW_DISTANCES[q1][q2]) for (r2, q2) in CELLS] for (r1, q1) in CELLS]
+
+# DISTANCES[i][j] -> dr + dq between the cells with indices i and j
+DISTANCES = [[dr + dq for (dr, dq) in row] for row in R_Q_DISTANCES]
+
+# ADJACENT[i][j] -> whether the cells are within one row and one column of each other (a cell is adjacent to itself)
+ADJACENT = [[dr <= 1 and dq <= 1 for (dr, dq) in row] for row in R_Q_DISTANCES]
+
+# ADJACENT_CELLS[i] -> the (r, q) cells adjacent to cell i, including cell i itself
+ADJACENT_CELLS = [tuple(CELLS[j] for j in range(NUM_CELLS) if ADJACENT[i][j]) for i in range(NUM_CELLS)]
+
+# NEIGHBOURS[i] -> the set of (r, q) cells adjacent to cell i, not including cell i itself
+NEIGHBOURS = [frozenset(cell for cell in ADJACENT_CELLS[i] if cell != CELLS[i]) for i in range(NUM_CELLS)]
+
+# NEIGHBOUR_INDICES[i] -> NEIGHBOURS[i] as a tuple of cell indices
+NEIGHBOUR_INDICES = [tuple(sorted(CELL_INDEX[cell] for cell in NEIGHBOURS[i])) for i in range(NUM_CELLS)]
+
+# NEIGHBOUR_MASKS[i] -> NEIGHBOURS[i] as a bit mask of cell indices
+NEIGHBOUR_MASKS = [sum(1 << CELL_INDEX[cell] for cell in NEIGHBOURS[i]) for i in range(NUM_CELLS)]
+
+# CELLS_BY_DISTANCE[i] -> every cell index, closest to cell i first
+CELLS_BY_DISTANCE = [sorted(range(NUM_CELLS), key=lambda j: DISTANCES[i][j]) for i in range(NUM_CELLS)]
@@ -0,0 +1,115 @@
+# An incrementally maintained threat map: for each cell, how many ways the stacks of each colour can spread onto it.
+# A stack of power k reaches k cells along each of the six directions (not just its neighbours), so whether a cell is
+# safe to spawn on, or whether a stack can be captured, depends on every stack within six cells of it along a line.
+from referee.game import PlayerColor
+
+from .tables import NUM_CELLS, CELL_INDEX, SPREAD_TARGET_INDICES
+
+
+class ThreatMap:
+    '''
+    counts[colour][cell] is the number of (stack, direction) pairs of that colour that land on the cell with one spread.
+    The counts are updated as each cell changes, so is_threatened is a lookup.
+    owners[cell] is the colour of the stack on each cell (None if empty). threatened[colour] is the number of
+    that colour's stacks that the other colour can spread onto. It is only kept once something has asked for it (with
+    threatened_stacks), as it adds a check to every target of every update, which the search pays for whether it reads
+    the count or not. From then on it changes when a count goes to or from 0 under a stack of the other colour, or when
+    a threatened cell changes hands.
+    '''
+
+    def __init__(self):
+        self.counts = [[0] * NUM_CELLS, [0] * NUM_CELLS]
+        self.owners = [None] * NUM_CELLS
+        self.threatened = None
+
+    @classmethod
+    def from_board(cls, board: dict):
+        '''Build a threat map from a dictionary of (r, q) coordinates and (p, k) cell states'''
+        threats = cls()
+        for (cell, tile) in board.items():
+            threats.update(CELL_INDEX[cell], None, tile)
+        return threats
+
+    def add_stack(self, cell, tile):
+        '''Add the threats of a (p, k) stack on the cell with the given index'''
+        color = tile[0].value
+        counts = self.counts[color]
+        k = tile[1] - 1
+        if self.threatened is None:
+            for by_power in SPREAD_TARGET_INDICES[cell]:
+                for target in by_power[k]:
+                    counts[target] += 1
+            return
+
+        # The same loop, also counting the other colour's stacks that come under threat
+        owners = self.owners
+        other = tile[0].opponent
+        for by_power in SPREAD_TARGET_INDICES[cell]:
+            for target in by_power[k]:
+                count = counts[target]
+                counts[target] = count + 1
+                if count == 0 and owners[target] == other:
+                    self.threatened[1 - color] += 1
+
+    def remove_stack(self, cell, tile):
+        '''Remove the threats of a (p, k) stack on the cell with the given index'''
+        color = tile[0].value
+        counts = self.counts[color]
+        k = tile[1] - 1
+        if self.threatened is None:
+            for by_power in SPREAD_TARGET_INDICES[cell]:
+                for target in by_power[k]:
+                    counts[target] -= 1
+            return
+
+        owners = self.owners
+        other = tile[0].opponent
+        for by_power in SPREAD_TARGET_INDICES[cell]:
+            for target in by_power[k]:
+                count = counts[target] - 1
+                counts[target] = count
+                if count == 0 and owners[target] == other:
+                    self.threatened[1 - color] -= 1
+
+    def update(self, cell, prev, tile):
+        '''Update the map for a cell changing from the prev (p, k) state to the new one (either may be None)'''
+        threatened = self.threatened
+        if prev is not None:
+            self.remove_stack(cell, prev)
+            if threatened is not None:
+                color = prev[0].value
+                if self.counts[1 - color][cell] > 0:
+                    threatened[color] -= 1
+            self.owners[cell] = None
+        if tile is not None:
+            self.owners[cell] = tile[0]
+            if threatened is not None:
+                color = tile[0].value
+                if self.counts[1 - color][cell] > 0:
+                    threatened[color] += 1
+            self.add_stack(cell, tile)
+
+    def count_threatened(self):
+        '''Count the [red, blue] stacks that the other colour can spread onto, from the counts and owners'''
+        threatened = [0, 0]
+        for (cell, color) in enumerate(self.owners):
+            if color is not None and self.counts[1 - color.value][cell] > 0:
+                threatened[color.value] += 1
+        return threatened
+
+    def threatened_stacks(self, color: PlayerColor):
+        '''Get the number of stacks of the given colour that the other colour can spread onto. The first call counts
+        them, and the count is kept up to date from then on'''
+        if self.threatened is None:
+            self.threatened = self.count_threatened()
+        return self.threatened[color.value]
+
+    def is_threatened(self, cell, by: PlayerColor):
+        '''Check if any stack of the given colour can spread onto the cell with the given index'''
+        return self.counts[by.value][cell] > 0
+
+    def __eq__(self, other):
+        # A kept count of threatened stacks must match the count from scratch
+        return (isinstance(other, ThreatMap) and self.counts == other.counts and self.owners == other.owners
+                and self.threatened in (None, self.count_threatened())
+                and other.threatened in (None, other.count_threatened()))
@@ -0,0 +1,102 @@
+# Time management for the agent's strategies.
+# The referee passes the CPU time left for the whole game as time_remaining (None without a time limit), and only
+# counts time spent inside the agent's calls (time.process_time()), so deadlines are in process time as well.
+import time
+
+from referee.game import MAX_TURNS
+
+from .agentboard import BoardState
+from .tables import CELL_INDEX
+from .threats import ThreatMap
+
+
+class TimeManager:
+    '''
+    Allocates a budget for each move, from the time left, the number of moves we expect still to play and how volatile
+    the position is. start() is called at the beginning of each action(), and a strategy then polls the two deadlines:
+    the soft deadline is when to stop starting new work (such as another iteration of deepening), and the hard
+    deadline is when to return whatever move is in hand. Without a time limit, limited is False and the deadlines come
+    from the default budget, so strategies with no natural stopping point still stop.
+    '''
+    # The budget of each move when the referee gives no time limit
+    DEFAULT_BUDGET = 1.0
+
+    # Most games are over well before MAX_TURNS. The game is planned as if it will run to this many turns (or a little
+    # longer, if it already has), so the early moves are not starved of time
+    EXPECTED_GAME_LENGTH = 120
+    MIN_MOVES_LEFT = 10
+
+    # The budget grows by up to this fraction when every stack on the board is under threat
+    VOLATILITY_WEIGHT = 1.0
+
+    # CPU time set aside for each move left, for the work done outside the deadlines (the referee's turn() calls, and
+    # setting up and returning each move, which takes about this long even with no time to search). Without it the
+    # time left can run out in the last few moves
+    MOVE_OVERHEAD = 0.025
+
+    # The hard deadline is this many times the budget, but never more than MAX_SHARE of the time left
+    HARD_FACTOR = 3.0
+    MAX_SHARE = 0.25
+
+    def __init__(self, default_budget=DEFAULT_BUDGET):
+        self.default_budget = default_budget
+        self.start_time = None
+        self.limited = False
+        self.budget = None
+        self.soft_deadline = None
+        self.hard_deadline = None
+
+    def start(self, boardSt: BoardState, **referee: dict):
+        '''Start the clock for a move, and set the deadlines from the referee's time_remaining'''
+        self.start_time = time.process_time()
+        time_remaining = referee.get("time_remaining")
+        self.limited = time_remaining is not None
+        if time_remaining is None:
+            self.budget = self.default_budget
+            hard = self.default_budget * self.HARD_FACTOR
+        else:
+            moves_left = self.estimate_moves_left(boardSt)
+            # The overhead is set aside for every move the game could still last, not just the expected ones, so
+            # a game that runs long still ends with time in hand
+            time_remaining = max(0, time_remaining - self.MOVE_OVERHEAD * self.max_moves_left(boardSt))
+            self.budget = time_remaining / moves_left
+            self.budget *= 1 + self.VOLATILITY_WEIGHT * self.volatility(boardSt)
+            hard = min(self.budget * self.HARD_FACTOR, time_remaining * self.MAX_SHARE)
+            self.budget = min(self.budget, hard)
+        self.soft_deadline = self.start_time + self.budget
+        self.hard_deadline = self.start_time + hard
+
+    @classmethod
+    def estimate_moves_left(cls, boardSt: BoardState):
+        '''Estimate how many more moves we will play, never more than the turns left before MAX_TURNS allow'''
+        turns_left = max(cls.EXPECTED_GAME_LENGTH, boardSt.depth + 2 * cls.MIN_MOVES_LEFT) - boardSt.depth
+        return max(1, min(turns_left, MAX_TURNS - boardSt.depth) // 2)
+
+    @staticmethod
+    def max_moves_left(boardSt: BoardState):
+        '''Get the most moves we can still play, if the game lasts until MAX_TURNS'''
+        return (MAX_TURNS - boardSt.depth + 1) // 2
+
+    @staticmethod
+    def volatility(boardSt: BoardState):
+        '''The fraction of stacks on the board that the opponent's stacks can capture with one spread (0 to 1). The
+        threat map is built for this alone: the board's own map (boardSt.threats) would then be kept up to date through
+        every make_move/unmake_move of the search that follows, which never reads it'''
+        if not boardSt.board:
+            return 0
+        threats = ThreatMap.from_board(boardSt.board)
+        threatened = sum(threats.is_threatened(CELL_INDEX[cell], player.opponent)
+                         for (cell, (player, _)) in boardSt.board.items())
+        return threatened / len(boardSt.board)
+
+    def elapsed(self):
+        '''Get the CPU time used since start()'''
+        return time.process_time() - self.start_time
+
+    def soft_expired(self):
+        '''Check if the soft deadline has passed'''
+        return time.process_time() >= self.soft_deadline
+
+    def hard_expired(self):
+        '''Check if the hard deadline has passed'''
+        return time.process_time() >= self.hard_deadline
@@ -0,0 +1,240 @@
+# A transposition table for the agent's search.
+# Positions reached through different move orders (eg. two spawns played in either order) share a Zobrist hash, so
+# the result of searching one can be reused for the others.
+
+# Bound types of a stored score
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Rough size in bytes of one stored entry: a 5-tuple, a 64-bit key and its slot in the table
+ENTRY_BYTES = 160
+
+# The fraction of the remaining space (as reported by the referee) that the table may use
+SPACE_FRACTION = 0.25
+
+# Number of entries to use when the referee does not impose a space limit, and the bounds on the entry count
+DEFAULT_CAPACITY = 1 << 17
+MIN_CAPACITY = 1 << 10
+MAX_CAPACITY = 1 << 20
+
+
+class TranspositionTable:
+    '''
+    A fixed capacity transposition table. Each bucket has two slots: a depth-preferred slot, which is only replaced by
+    an entry searched at least as deep, and an always-replace slot, which takes every entry that doesn't go into the
+    depth-preferred slot. Entries are tuples of (key, depth, bound, score, move).
+    '''
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        '''capacity is the total number of entries, split evenly between the two slots of each bucket'''
+        self.n_buckets = max(1, capacity // 2)
+        self._deep = [None] * self.n_buckets
+        self._recent = [None] * self.n_buckets
+
+        # Counters for tuning the table size and replacement policy
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    @classmethod
+    def from_referee(cls, **referee: dict):
+        '''Create a table sized from the space_remaining / space_limit (in MB) that the referee passes to the agent'''
+        return cls(cls.capacity_for_space(referee.get("space_remaining") or referee.get("space_limit")))
+
+    @staticmethod
+    def capacity_for_space(space_mb):
+        '''Get the number of entries that fit in the given space (in MB), or the default if there is no limit'''
+        if space_mb is None:
+            return DEFAULT_CAPACITY
+        capacity = int(space_mb * SPACE_FRACTION * 1024 * 1024 / ENTRY_BYTES)
+        return max(MIN_CAPACITY, min(MAX_CAPACITY, capacity))
+
+    @property
+    def capacity(self):
+        '''The total number of entries the table can hold'''
+        return 2 * self.n_buckets
+
+    def probe(self, key):
+        '''Return the (key, depth, bound, score, move) entry stored for the given key, or None if there isn't one'''
+        i = key % self.n_buckets
+        entry = self._deep[i]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self._recent[i]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        '''Store the result of searching the position with the given key'''
+        i = key % self.n_buckets
+        entry = (key, depth, bound, score, move)
+        self.stores += 1
+
+        deep = self._deep[i]
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                # The entry it replaces gets a second chance in the always-replace slot
+                recent = self._recent[i]
+                if recent is not None and recent[0] != key and recent[0] != deep[0]:
+                    self.overwrites += 1
+                self._recent[i] = deep
+            self._deep[i] = entry
+            return
+
+        recent = self._recent[i]
+        if recent is not None and recent[0] != key:
+            self.overwrites += 1
+        self._recent[i] = entry
+
+    def clear(self):
+        '''Remove every entry, and reset the counters'''
+        self._deep = [None] * self.n_buckets
+        self._recent = [None] * self.n_buckets
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def __len__(self):
+        '''The number of entries currently stored'''
+        return self.n_buckets * 2 - self._deep.count(None) - self._recent.count(None)
+
+    def stats(self):
+        '''Get the hit / miss / overwrite counters, for tuning'''
+        probes = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
+
+
+# Layout of the data word of a SharedTranspositionTable entry: the move (plus one, so that 0 means no move), the bound,
+# the depth and the score (offset to be non-negative)
+_MOVE_BITS = 9
+_BOUND_SHIFT = _MOVE_BITS
+_DEPTH_SHIFT = _BOUND_SHIFT + 2
+_SCORE_SHIFT = _DEPTH_SHIFT + 8
+_SCORE_OFFSET = 1 << 20
+_MASK_64 = (1 << 64) - 1
+
+# Size in bytes of one shared entry (two 64-bit words), and the bound on the entry count of a shared table
+SHARED_ENTRY_BYTES = 16
+SHARED_MAX_CAPACITY = 1 << 22
+
+
+class SharedTranspositionTable(TranspositionTable):
+    '''
+    A transposition table in a multiprocessing.shared_memory block, so that the processes of a parallel search can all
+    read and write it. It has the same buckets, replacement policy and interface as TranspositionTable.
+
+    Entries are two 64-bit words: the data (depth, bound, score and move packed together) and the key XORed with the
+    data. There are no locks. Two processes can write the same entry at once and leave the words of different entries
+    behind, but then the XOR of the words is not the key, and the entry is treated as missing. The counters are kept
+    per process.
+    '''
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        from multiprocessing import shared_memory
+
+        self.n_buckets = max(1, capacity // 2)
+        # Each bucket is four words: the depth-preferred slot, then the always-replace slot
+        self.shm = shared_memory.SharedMemory(create=True, size=self.n_buckets * 2 * SHARED_ENTRY_BYTES)
+        self.words = self.shm.buf.cast('Q')
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    @staticmethod
+    def capacity_for_space(space_mb):
+        '''Get the number of entries that fit in the given space (in MB), or the default if there is no limit'''
+        if space_mb is None:
+            return DEFAULT_CAPACITY
+        capacity = int(space_mb * SPACE_FRACTION * 1024 * 1024 / SHARED_ENTRY_BYTES)
+        return max(MIN_CAPACITY, min(SHARED_MAX_CAPACITY, capacity))
+
+    @staticmethod
+    def pack(depth, bound, score, move):
+        '''Pack the fields of an entry into one data word'''
+        return ((score + _SCORE_OFFSET) << _SCORE_SHIFT | depth << _DEPTH_SHIFT | bound << _BOUND_SHIFT
+                | (0 if move is None else move + 1))
+
+    @staticmethod
+    def unpack(key, data):
+        '''Unpack a data word into a (key, depth, bound, score, move) entry'''
+        move = data & ((1 << _MOVE_BITS) - 1)
+        return (key, data >> _DEPTH_SHIFT & 0xff, data >> _BOUND_SHIFT & 0x3,
+                (data >> _SCORE_SHIFT) - _SCORE_OFFSET, move - 1 if move else None)
+
+    def _read(self, slot):
+        '''Read the (key, data) of a slot, or None if it is empty or torn'''
+        words = self.words
+        data = words[2 * slot]
+        check = words[2 * slot + 1]
+        if data == 0:
+            return None
+        return (check ^ data, data)
+
+    def _write(self, slot, key, data):
+        '''Write a (key, data) entry to a slot. The data word goes first, so a reader never pairs a new key with old data
+        without the check failing'''
+        words = self.words
+        words[2 * slot] = data
+        words[2 * slot + 1] = (key ^ data) & _MASK_64
+
+    def probe(self, key):
+        '''Return the (key, depth, bound, score, move) entry stored for the given key, or None if there isn't one'''
+        i = 2 * (key % self.n_buckets)
+        for slot in (i, i + 1):
+            stored = self._read(slot)
+            if stored is not None and stored[0] == key:
+                self.hits += 1
+                return self.unpack(key, stored[1])
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        '''Store the result of searching the position with the given key'''
+        i = 2 * (key % self.n_buckets)
+        data = self.pack(min(depth, 0xff), bound, score, move)
+        self.stores += 1
+
+        deep = self._read(i)
+        if deep is None or deep[0] == key or depth >= (deep[1] >> _DEPTH_SHIFT & 0xff):
+            if deep is not None and deep[0] != key:
+                # The entry it replaces gets a second chance in the always-replace slot
+                recent = self._read(i + 1)
+                if recent is not None and recent[0] != key and recent[0] != deep[0]:
+                    self.overwrites += 1
+                self._write(i + 1, *deep)
+            self._write(i, key, data)
+            return
+
+        recent = self._read(i + 1)
+        if recent is not None and recent[0] != key:
+            self.overwrites += 1
+        self._write(i + 1, key, data)
+
+    def clear(self):
+        '''Remove every entry, and reset the counters'''
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def __len__(self):
+        '''The number of entries currently stored'''
+        return sum(self._read(slot) is not None for slot in range(2 * self.n_buckets))
+
+    def close(self, unlink=True):
+        '''Release the shared memory block. The process that created it should also unlink it, to free it'''
+        self.words.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
@@ -0,0 +1,66 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+from referee.game import \
+    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
+
+from agent.agentboard import BoardState
+from agent.config import VERIFY
+from agent.moves import decode_move
+from agent.strategy import ParentStrategy, OneMoveStrategy2, TwoMoveStrategy, RandomStrategy, MCTSStrategy
+
+
+# This is the entry point for your game playing agent. Currently the agent
+# simply spawns a token at the centre of the board if playing as RED, and
+# spreads a token at the centre of the board if playing as BLUE. This is
+# intended to serve as an example of how to use the referee API -- obviously
+# this is not a valid strategy for actually playing the game!
+
+class Agent:
+    """
+    A parent class for all agents. Note that this class is not intended to be used directly.
+    """
+    def __init__(self, color: PlayerColor, **referee: dict):
+        """
+        Initialise the agent.
+        """
+        self._color = color
+        
+        # Initialise the strategy. This will be the only line you need to change for child Agents.
+        self.strategy = MCTSStrategy(color, **referee)
+
+        # Initialise the board
+        self.board = BoardState({}, [], 0, self._color, debug=VERIFY)
+
+
+    def action(self, **referee: dict) -> Action:
+        """
+        Return the next action to take. Strategies may return encoded moves (see moves.py), which are only
+        converted to referee Actions here.
+        """
+        action = self.strategy.action(self.board, **referee)
+        if isinstance(action, int):
+            action = decode_move(action)
+        return action
+
+    def turn(self, color: PlayerColor, action: Action, **referee: dict):
+        """
+        Update the agent with the last player's action, then let the strategy carry its search state over to the
+        new position.
+        """
+        self.board.update_boardstate(action, color)
+        self.strategy.turn(self.board, color, action, **referee)
+
+class MCTSAgent(Agent):
+    """ 
+    An agent that searches with Monte-Carlo tree search.
+    Uses inheritance to inherit the action method from the Agent class.
+    """
+    def __init__(self, color: PlayerColor, **referee: dict):
+        """
+        Initialise the agent.
+        """
+        super().__init__(color, **referee)
+
+        # Initialise the strategy
+        self.strategy = MCTSStrategy(color, **referee)
\ No newline at end of file
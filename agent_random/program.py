@@ -5,6 +5,8 @@ from referee.game import \
     PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
 
 from agent.agentboard import BoardState
+from agent.config import VERIFY
+from agent.moves import decode_move
 from agent.strategy import ParentStrategy, OneMoveStrategy2, TwoMoveStrategy, RandomStrategy
 
 
@@ -28,21 +30,26 @@ class Agent:
         self.strategy = RandomStrategy(color, **referee)
 
         # Initialise the board
-        self.board = BoardState({}, [], 0, self._color)
+        self.board = BoardState({}, [], 0, self._color, debug=VERIFY)
 
 
     def action(self, **referee: dict) -> Action:
         """
-        Return the next action to take.
+        Return the next action to take. Strategies may return encoded moves (see moves.py), which are only
+        converted to referee Actions here.
         """
         action = self.strategy.action(self.board, **referee)
+        if isinstance(action, int):
+            action = decode_move(action)
         return action
 
     def turn(self, color: PlayerColor, action: Action, **referee: dict):
         """
-        Update the agent with the last player's action.
+        Update the agent with the last player's action, then let the strategy carry its search state over to the
+        new position.
         """
         self.board.update_boardstate(action, color)
+        self.strategy.turn(self.board, color, action, **referee)
 
 class RandomAgent(Agent):
     """ 
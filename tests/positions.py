@@ -0,0 +1,33 @@
+# Random positions for the tests: each is reached by playing random legal moves from the empty board.
+import random
+
+from referee.game import PlayerColor
+
+from agent.agentboard import BoardState
+from agent.evaluation import is_game_over
+from agent.search import Searcher
+from agent.tables import CELLS
+
+
+def random_positions(count, seed, min_moves=4, max_moves=20, debug=False):
+    '''Generate (board state, colour to move) pairs for count random games that are not over. Each board state is fresh,
+    with no moves to undo'''
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        boardSt = BoardState({}, [], 0, PlayerColor.RED)
+        color = PlayerColor.RED
+        for _ in range(rng.randrange(min_moves, max_moves)):
+            boardSt.make_move(rng.choice(Searcher.legal_moves(boardSt, color)), color)
+            color = color.opponent
+            if is_game_over(boardSt):
+                break
+        if not is_game_over(boardSt):
+            positions.append((BoardState(dict(boardSt.board), [], boardSt.depth, color, debug), color))
+    return positions
+
+
+def random_board(rng):
+    '''A random board of up to 30 stacks, of every power, with no regard for how it could be reached'''
+    return {cell: (rng.choice(list(PlayerColor)), rng.randrange(1, 7))
+            for cell in rng.sample(CELLS, rng.randrange(1, 30))}
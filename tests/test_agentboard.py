@@ -0,0 +1,38 @@
+# BoardState.move_delta works out a move's effect from the cells it touches, without building the child board. These
+# tests check it, and the scoring functions built on it, against the child boards from get_new_boardstate.
+import random
+
+from referee.game import PlayerColor
+
+from agent.agentboard import BoardState
+from positions import random_board
+
+
+def test_move_delta_matches_child_boards():
+    rng = random.Random(1)
+    for _ in range(300):
+        boardSt = BoardState(random_board(rng), [], 0, rng.choice(list(PlayerColor)))
+        for color in PlayerColor:
+            for move in boardSt.get_encoded_spreadmoves(color) + boardSt.get_encoded_spawnmoves():
+                child = boardSt.get_new_boardstate(move, color)
+                my_power = boardSt.get_color_power(color)
+                opp_power = boardSt.get_opp_power(color)
+                new_opp_power = boardSt.get_opp_power(color, child)
+                (mine, theirs, wins) = boardSt.move_delta(move, color)
+                assert mine == boardSt.get_opp_power(color.opponent, child) - my_power
+                assert theirs == new_opp_power - opp_power
+                assert wins == (new_opp_power == 0)
+
+                assert boardSt.calculate_move_impact(move, color) == \
+                    boardSt.get_board_net_score(child) - boardSt.get_board_net_score(boardSt.board)
+                assert boardSt.calculate_move_opp_impact(move, color) == new_opp_power - opp_power
+                assert boardSt.check_if_move_wins(move, color) == (new_opp_power == 0)
+
+
+def test_move_impact_accepts_actions():
+    rng = random.Random(2)
+    boardSt = BoardState(random_board(rng), [], 0, PlayerColor.RED)
+    for action in boardSt.get_spreadmoves(PlayerColor.BLUE) + boardSt.get_spawnmoves():
+        child = boardSt.get_new_boardstate(action, PlayerColor.BLUE)
+        assert boardSt.calculate_move_impact(action, PlayerColor.BLUE) == \
+            boardSt.get_board_net_score(child) - boardSt.get_board_net_score(boardSt.board)
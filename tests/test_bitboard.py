@@ -0,0 +1,62 @@
+# BitBoardState keeps the board as occupancy masks and a powers list. These tests check its moves, move deltas and
+# make/unmake against BoardState, and that TwoMoveStrategy scores moves alike on either.
+import random
+
+from referee.game import PlayerColor
+
+from agent.agentboard import BoardState
+from agent.bitboard import BitBoardState
+from agent.search import Searcher
+from agent.strategy import TwoMoveStrategy
+from agent.tables import NUM_CELLS
+from positions import random_positions, random_board
+
+
+def positions(seed):
+    '''Positions from random games, and random boards with stacks of every power'''
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(100):
+        color = rng.choice(list(PlayerColor))
+        boards.append((BoardState(random_board(rng), [], 0, color), color))
+    return random_positions(100, seed, min_moves=1, max_moves=60) + boards
+
+
+def test_queries_match_boardstate():
+    for (boardSt, color) in positions(12):
+        bitSt = BitBoardState.from_boardstate(boardSt)
+        bitSt.verify_counters()
+        assert bitSt.to_board() == boardSt.board
+        assert bitSt.hash == boardSt.hash
+        assert bitSt.get_encoded_spreadmoves(color) == boardSt.get_encoded_spreadmoves(color)
+        assert bitSt.get_encoded_spawnmoves() == boardSt.get_encoded_spawnmoves()
+        for other in PlayerColor:
+            assert bitSt.get_color_power(other) == boardSt.get_color_power(other)
+            assert bitSt.get_tile_count(other) == boardSt.get_tile_count(other)
+            assert bitSt.check_if_win(other) == boardSt.check_if_win(other)
+        for cell in range(NUM_CELLS):
+            assert bitSt.highest_opp_power_adjacent(cell, color) == boardSt.highest_opp_power_adjacent(cell, color)
+
+
+def test_moves_match_boardstate():
+    for (boardSt, color) in positions(13):
+        bitSt = BitBoardState(boardSt.board, boardSt.depth, boardSt.agentColor, debug=True)
+        for move in Searcher.legal_moves(boardSt, color):
+            assert bitSt.move_delta(move, color) == boardSt.move_delta(move, color)
+            assert bitSt.calculate_move_impact(move, color) == boardSt.calculate_move_impact(move, color)
+            bitSt.make_move(move, color)
+            boardSt.make_move(move, color)
+            assert bitSt.to_board() == boardSt.board
+            assert bitSt.hash == boardSt.hash
+            bitSt.unmake_move()
+            boardSt.unmake_move()
+            assert bitSt.to_board() == boardSt.board
+            assert bitSt.hash == boardSt.hash
+
+
+def test_two_move_scores_match_boardstate():
+    for (boardSt, color) in random_positions(20, seed=14, min_moves=2, max_moves=40):
+        strategy = TwoMoveStrategy(color)
+        bitSt = BitBoardState.from_boardstate(boardSt)
+        for move in Searcher.legal_moves(boardSt, color):
+            assert strategy.evaluate_move(bitSt, move) == strategy.evaluate_move(boardSt, move)
@@ -0,0 +1,54 @@
+# The evaluation features are kept up to date as moves are made and unmade (see evaluation.py). These tests play random
+# games on board states in debug mode, which check the board's counters, threat map and group map against a rescan
+# after every move and every undo, and compare every feature with its from-scratch version along the way.
+import random
+
+from referee.game import PlayerColor
+
+from agent.agentboard import BoardState
+from agent.evaluation import FEATURES, evaluate, feature_values, verify_features, is_game_over
+from agent.search import Searcher
+
+
+def test_features_match_rescan_through_make_and_unmake():
+    rng = random.Random(3)
+    for _ in range(40):
+        boardSt = BoardState({}, [], 0, PlayerColor.RED, debug=True)
+        color = PlayerColor.RED
+        # Build the threat map and group map from the empty board, so every later change is made incrementally
+        for c in PlayerColor:
+            verify_features(boardSt, c)
+
+        for _ in range(rng.randrange(10, 80)):
+            boardSt.make_move(rng.choice(Searcher.legal_moves(boardSt, color)), color)
+            color = color.opponent
+            for c in PlayerColor:
+                verify_features(boardSt, c)
+            if rng.random() < 0.3:
+                boardSt.unmake_move()
+                color = color.opponent
+                for c in PlayerColor:
+                    verify_features(boardSt, c)
+            if is_game_over(boardSt):
+                break
+
+        # Undoing everything leaves an empty board, with every feature back at 0
+        while boardSt.undo_stack:
+            boardSt.unmake_move()
+        assert boardSt.board == {}
+        assert feature_values(boardSt, PlayerColor.RED) == {name: 0 for (name, _, _, _) in FEATURES}
+
+
+def test_features_are_antisymmetric():
+    rng = random.Random(5)
+    boardSt = BoardState({}, [], 0, PlayerColor.RED)
+    color = PlayerColor.RED
+    for _ in range(30):
+        boardSt.make_move(rng.choice(Searcher.legal_moves(boardSt, color)), color)
+        color = color.opponent
+        red = feature_values(boardSt, PlayerColor.RED)
+        blue = feature_values(boardSt, PlayerColor.BLUE)
+        assert all(red[name] == -blue[name] for name in red)
+        assert evaluate(boardSt, PlayerColor.RED) == -evaluate(boardSt, PlayerColor.BLUE)
+        if is_game_over(boardSt):
+            break
@@ -0,0 +1,52 @@
+# MCTS plays its games out on array boards, with its own move generation and move rules (see mcts.play and
+# mcts.legal_moves). These tests check them against BoardState and the searcher's legal moves.
+import random
+
+from referee.game import PlayerColor
+
+from agent.agentboard import BoardState
+from agent.arrayboard import encode_board
+from agent.mcts import play, legal_moves
+from agent.ordering import captured_power
+from agent.search import Searcher
+from positions import random_positions, random_board
+
+
+def powers(cells):
+    '''The (RED power, BLUE power) of an array board'''
+    return sum(k for k in cells if k > 0), -sum(k for k in cells if k < 0)
+
+
+def positions(seed):
+    '''Positions from random games, and random boards with stacks of every power'''
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(200):
+        color = rng.choice(list(PlayerColor))
+        boards.append((BoardState(random_board(rng), [], 0, color), color))
+    return random_positions(200, seed, min_moves=1, max_moves=60) + boards
+
+
+def test_legal_moves_match_searcher():
+    for (boardSt, color) in positions(8):
+        cells = encode_board(boardSt.board)
+        sign = 1 if color == PlayerColor.RED else -1
+        (captures, others) = legal_moves(cells, sign, sum(powers(cells)))
+        assert sorted(captures + others) == sorted(Searcher.legal_moves(boardSt, color))
+        # The captures are the spreads that land on at least one of the opponent's stacks
+        assert sorted(captures) == sorted(move for move in captures + others
+                                          if captured_power(boardSt.board, move, color) > 0)
+
+
+def test_play_matches_make_move():
+    for (boardSt, color) in positions(9):
+        cells = encode_board(boardSt.board)
+        sign = 1 if color == PlayerColor.RED else -1
+        (red, blue) = powers(cells)
+        for move in Searcher.legal_moves(boardSt, color):
+            child = list(cells)
+            result = play(child, move, sign, red, blue)
+            boardSt.make_move(move, color)
+            assert child == encode_board(boardSt.board)
+            assert result == powers(child)
+            boardSt.unmake_move()
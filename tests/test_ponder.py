@@ -0,0 +1,29 @@
+# Tests of pondering: the thread is only started when it fits in the referee's space limit, and its search runs on the
+# thread's small stack.
+import time
+
+from agent.ponder import Ponderer, STACK_SIZE, SPACE_FRACTION, limit_malloc_arenas
+from agent.search import Searcher
+from agent.transposition import TranspositionTable
+from positions import random_positions
+
+
+def test_ponderer_fits_space_limit():
+    needed = Ponderer.thread_space(limit_malloc_arenas())
+    assert needed >= STACK_SIZE
+    fits = needed / SPACE_FRACTION / (1024 * 1024)
+    searcher = Searcher(TranspositionTable(1 << 10))
+    assert Ponderer.from_referee(searcher, space_remaining=None, space_limit=None) is not None
+    assert Ponderer.from_referee(searcher, space_remaining=fits * 2, space_limit=fits * 2) is not None
+    assert Ponderer.from_referee(searcher, space_remaining=fits / 2, space_limit=fits * 2) is None
+
+
+def test_ponder_searches_in_thread():
+    for (boardSt, color) in random_positions(3, seed=4, min_moves=10, max_moves=20):
+        board = dict(boardSt.board)
+        ponderer = Ponderer(Searcher(TranspositionTable(1 << 14)))
+        ponderer.start(boardSt, color)
+        time.sleep(0.2)
+        assert ponderer.stop(ponderer.predicted) is True
+        assert ponderer.result is not None and ponderer.nodes > 0
+        assert boardSt.board == board
@@ -0,0 +1,25 @@
+# The root-split pool shares TwoMoveStrategy's candidates out between processes (see rootsplit.py), and must pick the
+# same move as the strategy does on its own.
+from agent.rootsplit import RootSplitPool
+from agent.strategy import TwoMoveStrategy
+from positions import random_positions
+
+
+def test_pool_picks_serial_move():
+    strategies = {}
+    try:
+        for (boardSt, color) in random_positions(25, seed=10, min_moves=4, max_moves=40):
+            if color not in strategies:
+                strategy = TwoMoveStrategy(color)
+                strategies[color] = (strategy, RootSplitPool(3, strategy))
+            (strategy, pool) = strategies[color]
+            board = dict(boardSt.board)
+
+            strategy.pool = None
+            serial = strategy.action(boardSt)
+            strategy.pool = pool
+            assert strategy.action(boardSt) == serial
+            assert boardSt.board == board
+    finally:
+        for (_, pool) in strategies.values():
+            pool.close()
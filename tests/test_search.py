@@ -0,0 +1,80 @@
+# The alpha-beta searchers must find the same root score as a plain minimax search of the same tree: move ordering,
+# the transposition table and the null windows of PVS may only change how much of the tree is searched. Late-move
+# reductions and futility pruning are turned off, as they are allowed to change the score.
+import pytest
+
+import agent.search
+from agent.evaluation import evaluate, is_game_over, terminal_score
+from agent.ordering import captured_power
+from agent.search import Searcher, PVSearcher
+from agent.transposition import TranspositionTable
+
+from positions import random_positions
+
+
+class NoTable(TranspositionTable):
+    '''A transposition table that never remembers anything'''
+
+    def probe(self, key):
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        pass
+
+
+def quiesce(boardSt, color, ply, qdepth):
+    '''The quiescence search without pruning: the best of standing pat and every capture'''
+    best = evaluate(boardSt, color)
+    if qdepth >= agent.search.MAX_QUIESCENCE_DEPTH:
+        return best
+    for move in boardSt.get_encoded_spreadmoves(color):
+        if captured_power(boardSt.board, move, color) > 0:
+            best = max(best, -child_score(boardSt, move, color, ply, lambda: quiesce(boardSt, color.opponent, ply + 1,
+                                                                                      qdepth + 1)))
+    return best
+
+
+def minimax(boardSt, color, depth, ply=0):
+    '''Score a position by searching every move to the given depth, then quiescing'''
+    if depth == 0:
+        return quiesce(boardSt, color, ply, 0)
+    return max(-child_score(boardSt, move, color, ply, lambda: minimax(boardSt, color.opponent, depth - 1, ply + 1))
+               for move in Searcher.legal_moves(boardSt, color))
+
+
+def child_score(boardSt, move, color, ply, search):
+    '''Play a move, and score the result for the opponent with search() unless the game is over'''
+    boardSt.make_move(move, color)
+    score = terminal_score(boardSt, color.opponent, ply + 1) if is_game_over(boardSt) else search()
+    boardSt.unmake_move()
+    return score
+
+
+def search_score(searcher_class, tt, boardSt, color, depth):
+    '''The root score of a search to the given depth, with the selective search turned off'''
+    searcher = searcher_class(tt, lmr=False, futility=False)
+    (_, score, reached) = searcher.search(boardSt, color, max_depth=depth)
+    assert reached == depth
+    return score
+
+
+def test_root_scores_match_minimax(monkeypatch):
+    # A shallow quiescence search keeps the minimax reference quick
+    monkeypatch.setattr(agent.search, "MAX_QUIESCENCE_DEPTH", 2)
+    for (boardSt, color) in random_positions(8, seed=3, max_moves=12):
+        depth = 3 if len(boardSt.board) <= 4 else 2
+        expected = minimax(boardSt, color, depth)
+        for searcher_class in (Searcher, PVSearcher):
+            tt = TranspositionTable(1 << 12)
+            assert search_score(searcher_class, tt, boardSt, color, depth) == expected
+            # Searching again reuses the table's entries from the first search
+            assert search_score(searcher_class, tt, boardSt, color, depth) == expected
+
+
+@pytest.mark.parametrize("seed", [11, 12])
+def test_transposition_table_keeps_root_scores(seed):
+    # PVS re-searches children with a wider window straight after the null window, so these positions (with the full
+    # quiescence search) hit both fail-low and fail-high table entries
+    for (boardSt, color) in random_positions(10, seed=seed):
+        expected = search_score(Searcher, NoTable(), boardSt, color, 3)
+        assert search_score(PVSearcher, TranspositionTable(1 << 14), boardSt, color, 3) == expected
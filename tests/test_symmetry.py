@@ -0,0 +1,44 @@
+# Tests of the board symmetries: translated and colour-swapped copies of a position share a canonical key, and moves
+# (encoded or not) map between them.
+import random
+
+from agent.agentboard import BoardState
+from agent.moves import NUM_MOVES, decode_move, encode_action
+from agent.search import Searcher
+from agent.symmetry import (canonicalise, transform_board, transform_color, transform_move, untransform_move,
+                            TRANSLATE)
+from positions import random_positions
+
+
+def random_transform(rng):
+    return (rng.randrange(len(TRANSLATE)), rng.random() < 0.5)
+
+
+def test_transformed_positions_share_canonical_key():
+    rng = random.Random(5)
+    for (boardSt, color) in random_positions(40, seed=5):
+        (key, transform) = canonicalise(boardSt.board, color)
+        canonical = BoardState(transform_board(boardSt.board, transform), [], boardSt.depth, color)
+        assert Searcher.key(canonical, transform_color(color, transform)) == key
+        other = random_transform(rng)
+        assert canonicalise(transform_board(boardSt.board, other), transform_color(color, other))[0] == key
+
+
+def test_encoded_moves_match_actions():
+    rng = random.Random(6)
+    for _ in range(20):
+        transform = random_transform(rng)
+        for move in range(NUM_MOVES):
+            moved = transform_move(move, transform)
+            assert moved == encode_action(transform_move(decode_move(move), transform))
+            assert untransform_move(moved, transform) == move
+
+
+def test_legal_moves_map_to_legal_moves():
+    rng = random.Random(7)
+    for (boardSt, color) in random_positions(40, seed=7):
+        transform = random_transform(rng)
+        moved = BoardState(transform_board(boardSt.board, transform), [], boardSt.depth, color)
+        other = transform_color(color, transform)
+        assert (sorted(transform_move(move, transform) for move in Searcher.legal_moves(boardSt, color))
+                == sorted(Searcher.legal_moves(moved, other)))
@@ -0,0 +1,52 @@
+# Tests of the shared-memory transposition table: entries survive being packed into one word, and an entry whose two
+# words were written for different positions (by two processes at once) reads as missing.
+import itertools
+
+import pytest
+
+from agent.evaluation import WIN_SCORE
+from agent.moves import NUM_MOVES
+from agent.search import INFINITY
+from agent.transposition import SharedTranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+
+@pytest.fixture
+def table():
+    tt = SharedTranspositionTable(1 << 10)
+    yield tt
+    tt.close()
+
+
+def test_pack_round_trip():
+    scores = (0, 1, -1, WIN_SCORE, -WIN_SCORE, WIN_SCORE - 64, -WIN_SCORE + 64, INFINITY, -INFINITY)
+    for (depth, bound, score, move) in itertools.product((0, 1, 254, 255), (EXACT, LOWER_BOUND, UPPER_BOUND), scores,
+                                                         (None, 0, NUM_MOVES - 1)):
+        data = SharedTranspositionTable.pack(depth, bound, score, move)
+        assert data != 0
+        assert SharedTranspositionTable.unpack(12345, data) == (12345, depth, bound, score, move)
+
+
+def test_store_probe_round_trip(table):
+    for (key, score, move) in (((1 << 64) - 1, -WIN_SCORE, NUM_MOVES - 1), (0, WIN_SCORE, None), (1 << 63, -7, 0)):
+        table.store(key, 255, UPPER_BOUND, score, move)
+        assert table.probe(key) == (key, 255, UPPER_BOUND, score, move)
+        table.clear()
+
+
+def test_torn_entry_misses(table):
+    # Two keys in the same bucket, each stored in the depth-preferred slot in turn
+    first = 5
+    second = first + table.n_buckets
+    slot = 2 * (first % table.n_buckets)
+    table.store(second, 3, LOWER_BOUND, -20, 100)
+    second_words = (table.words[2 * slot], table.words[2 * slot + 1])
+    table.clear()
+    table.store(first, 4, EXACT, 10, 7)
+    assert table.probe(first) == (first, 4, EXACT, 10, 7)
+
+    # The data word of the second entry with the check word of the first, and the other way round
+    table.words[2 * slot] = second_words[0]
+    assert table.probe(first) is None and table.probe(second) is None
+    table.words[2 * slot] = SharedTranspositionTable.pack(4, EXACT, 10, 7)
+    table.words[2 * slot + 1] = second_words[1]
+    assert table.probe(first) is None and table.probe(second) is None